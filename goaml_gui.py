@@ -0,0 +1,318 @@
+import sys
+import gc
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QFileDialog, QComboBox, QTableView, QHeaderView)
+
+# Validation functions, settings and sessions
+import main as validator
+
+# Reason shown when the issues of a run cannot be browsed (the issues CSV file is not kept)
+browse_unavailable_text = 'Issues can only be browsed when csv is one of the OutputFormats in goaml_config.ini'
+
+
+# Worker validating the reports of the Reporting Entity on a background thread, so the window is not frozen during a run.
+# The progress of the run (from the progress_callback of the session) and its end are sent to the window as signals
+class ValidationWorker(QObject):
+    progress = pyqtSignal(dict)
+    finished = pyqtSignal()
+
+    def __init__(self, session):
+        super().__init__()
+        self.session = session
+
+    def run(self):
+        session = self.session
+        settings = session.settings
+        session.progress_callback = self.progress.emit
+        try: 
+           session.details += f'Validating Reports of {settings.report_entity_name} (rentity_id: {settings.report_entity_id}, SWIFT: {settings.report_entity_swift})\n'
+           session.details += '---------------------------------------------------------------------\n'
+
+           validator.validate_reporting_entity_local(settings.report_entity_name, settings.report_entity_id, settings.report_entity_swift, session.local_folder_path, session)
+
+           session.details += '\n'
+           session.details += 'All reports have been processed.\n'
+           # Clean memory
+           gc.collect()
+
+        except Exception as e:
+           session.details += f'Error in executing script for {settings.report_entity_name} [Error: {str(e)}]\n'
+           # Clean memory
+           gc.collect()
+
+        finally:
+           session.progress_callback = None
+           self.finished.emit()
+
+
+# Table model of the issues of a run, read on demand from the issues CSV file (validator.IssueFileIndex)
+
+# Only the rows shown in the table are read (in pages), so the table scrolls through millions of issues without
+# loading them. The rows are filtered and sorted by the index columns (report name, category and element)
+class IssueTableModel(QAbstractTableModel):
+    def __init__(self, issues_csv_path):
+        super().__init__()
+        self.issue_index = validator.IssueFileIndex(issues_csv_path)
+        self.filters = {}
+        self.sort_column = None
+        self.descending = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.issue_index)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.issue_index.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row = self.issue_index.row(index.row())
+        return row[index.column()] if index.column() < len(row) else None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.issue_index.columns[section]
+        return section + 1
+
+    # Sort by a column of the table (columns other than the index columns are shown in the order of the file)
+    def sort(self, column, order=Qt.AscendingOrder):
+        column_name = self.issue_index.columns[column] if 0 <= column < len(self.issue_index.columns) else None
+        self.sort_column = column_name if column_name in self.issue_index.index_columns else None
+        self.descending = order == Qt.DescendingOrder
+        self.update_view()
+
+    # Filter by the value of an index column (None = all values)
+    def set_filter(self, column, value):
+        if value is None:
+            self.filters.pop(column, None)
+        else:
+            self.filters[column] = value
+        self.update_view()
+
+    def update_view(self):
+        self.beginResetModel()
+        self.issue_index.set_view(self.filters, self.sort_column, self.descending)
+        self.endResetModel()
+
+
+# Window to browse the issues of a run: a filter for each index column and the table of issues
+class IssueBrowser(QWidget):
+    def __init__(self, issues_csv_path):
+        super().__init__()
+
+        self.setGeometry(400, 300, 1200, 700)
+        self.setWindowTitle("GOAML Tool - Reporting Issues")
+        self.layout = QVBoxLayout()
+
+        self.model = IssueTableModel(issues_csv_path)
+
+        # Filters (the first item of each filter shows all values)
+        filter_layout = QHBoxLayout()
+        for column in self.model.issue_index.index_columns:
+            filter_layout.addWidget(QLabel(f"{column}:"))
+            combo_box = QComboBox()
+            combo_box.addItem("(All)", None)
+            for value in self.model.issue_index.column_values(column):
+                combo_box.addItem(value, value)
+            combo_box.currentIndexChanged.connect(
+                lambda _, column=column, combo_box=combo_box: self.model.set_filter(column, combo_box.currentData()))
+            filter_layout.addWidget(combo_box)
+        self.layout.addLayout(filter_layout)
+
+        # Table of issues (rows have a fixed height, so only the rows shown are read)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table_view.setSortingEnabled(True)
+        self.layout.addWidget(self.table_view)
+
+        # Number of issues shown
+        self.count_label = QLabel("")
+        self.model.modelReset.connect(self.show_count)
+        self.show_count()
+        self.layout.addWidget(self.count_label)
+
+        self.setLayout(self.layout)
+
+    def show_count(self):
+        self.count_label.setText(f"{self.model.rowCount()} issues")
+
+
+# Main window. The runs of the window are validated in its session (the settings of the config file)
+class Window(QMainWindow):
+    def __init__(self, session):
+        super().__init__()
+        self.session = session
+
+        self.setGeometry(500, 500, 500, 400)
+        self.setWindowTitle("GOAML Tool")
+
+        # Create central widget and layout
+        self.central_widget = QWidget()
+        self.setCentralWidget(self.central_widget)
+        self.layout = QVBoxLayout()
+
+        # Input Folder Label and Button
+        self.input_label = QLabel("Input Folder: None")
+        self.layout.addWidget(self.input_label)
+
+        self.input_button = QPushButton("Select Input Folder")
+        self.input_button.clicked.connect(self.select_input_folder)
+        self.layout.addWidget(self.input_button)
+
+        # Output Folder Label and Button
+        self.output_label = QLabel("Output Folder: None")
+        self.layout.addWidget(self.output_label)
+
+        self.output_button = QPushButton("Select Output Folder")
+        self.output_button.clicked.connect(self.select_output_folder)
+        self.layout.addWidget(self.output_button)
+
+        # Validate Button
+        self.validate_button = QPushButton("Validate Configuration")
+        self.validate_button.clicked.connect(self.validateButton)
+        self.layout.addWidget(self.validate_button)
+
+        # Cancel Button (stops the running validation, the issues of the reports validated so far are saved)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_validation)
+        self.layout.addWidget(self.cancel_button)
+
+        # Progress Label
+        self.progress_label = QLabel("")
+        self.layout.addWidget(self.progress_label)
+
+        # Browse Issues Button (enabled when a run found issues). The issue browser reads the issues CSV file of the run,
+        # which is only kept if csv is one of the output formats
+        self.browse_button = QPushButton("Browse Issues")
+        self.browse_button.setEnabled(False)
+        if 'csv' not in self.session.settings.output_formats:
+            self.browse_button.setToolTip(browse_unavailable_text)
+        self.browse_button.clicked.connect(self.browse_issues)
+        self.layout.addWidget(self.browse_button)
+
+        # Output Details Label
+        self.output_details_label = QLabel("")
+        self.layout.addWidget(self.output_details_label)
+
+        self.central_widget.setLayout(self.layout)
+
+        # Thread and worker of the running validation
+        self.validation_thread = None
+        self.validation_worker = None
+        # Window browsing the issues of the last run
+        self.issue_browser = None
+
+
+    # Method to select input folder
+    def select_input_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Input Folder")
+     
+        if folder:
+            self.input_label.setText(f"Input Folder: {folder}")
+            self.session.local_folder_path = folder
+
+   
+    # Method to select output folder
+    def select_output_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Output Folder")
+        if folder:
+            self.output_label.setText(f"Output Folder: {folder}")
+            self.session.output_path = folder
+            
+
+    # Method to validate the configuration
+    def validateButton(self):
+        settings = self.session.settings
+        details = "Configuration Parameters:\n"
+        details += f"reporting_window = {settings.reporting_window}\n"
+        details += f"report_start_date = {settings.report_start_date}\n"
+        details += f"report_end_date = {settings.report_end_date}\n"
+        details += f"ctr_threshold = {settings.ctr_threshold}\n"
+        details += f"report_types = {settings.report_types}\n"
+        details += f"incorp_number_reg_types = {settings.incorp_number_reg_types}\n"
+        details += f"invalid_acc_prefixes = {settings.invalid_acc_prefixes}\n"
+        details += f"invalid_acc_chars = {settings.invalid_acc_chars}\n"
+        details += f"swift_name_match_threshold = {settings.swift_name_match_threshold}\n"
+        details += f"check_late_submissions = {settings.check_late_submissions}\n"
+        details += f"parser_engine = {'lxml' if settings.use_lxml else 'etree'}\n"
+        details += f"input = {self.session.local_folder_path}\n"
+        details += f"output = {self.session.output_path}\n"
+        details += f"----------------------------------------------------------------------------\n"
+        self.session.details = details
+
+        # Validate the reports on a background thread, the buttons that change the run are disabled until it ends
+        self.validation_thread = QThread()
+        self.validation_worker = ValidationWorker(self.session)
+        self.validation_worker.moveToThread(self.validation_thread)
+        self.validation_thread.started.connect(self.validation_worker.run)
+        self.validation_worker.progress.connect(self.show_progress)
+        self.validation_worker.finished.connect(self.validation_finished)
+
+        if self.issue_browser is not None:
+            self.issue_browser.close()
+            self.issue_browser = None
+        self.session.issues_csv_file = ''
+        self.set_running(True)
+        self.progress_label.setText("Validating reports ...")
+        self.output_details_label.setText("")
+        self.validation_thread.start()
+
+
+    # Method to enable the buttons for a running (or finished) validation
+    def set_running(self, running):
+        self.input_button.setEnabled(not running)
+        self.output_button.setEnabled(not running)
+        self.validate_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+        self.cancel_button.setText("Cancel")
+        self.browse_button.setEnabled(not running and bool(self.session.issues_csv_file))
+
+
+    # Method to show the progress of the running validation
+    def show_progress(self, progress):
+        self.progress_label.setText(
+            f"Validated {progress['files']} of {progress['total_files']} XML files "
+            f"({progress['files_per_second']:.1f} files/s, {progress['mb_per_second']:.2f} MB/s), "
+            f"{progress['issues']} issues so far, memory usage: {progress['memory_usage']:.0f} MB")
+
+
+    # Method to cancel the running validation (it stops after the reports being validated)
+    def cancel_validation(self):
+        self.session.cancel_event.set()
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.setText("Cancelling ...")
+
+
+    # Method to show the details of the finished validation
+    def validation_finished(self):
+        self.validation_thread.quit()
+        self.validation_thread.wait()
+        self.validation_thread = None
+        self.validation_worker = None
+        self.set_running(False)
+        # Display the details in the output details label
+        details = self.session.details
+        if self.session.run_summary.get('issues') and not self.session.issues_csv_file:
+            details += f'\n{browse_unavailable_text}'
+        self.output_details_label.setText(details)
+
+
+    # Method to open the issues of the last run in the issue browser
+    def browse_issues(self):
+        self.issue_browser = IssueBrowser(self.session.issues_csv_file)
+        self.issue_browser.show()
+
+
+# Function to start the GUI with the session of the config file read by main.py (the default config file if none is given)
+def main(session=None):
+    app = QApplication(sys.argv)
+    win = Window(session or validator.get_default_session())
+    win.show()
+    sys.exit(app.exec_())
@@ -1,98 +1,636 @@
 import sys
-from PyQt5 import QtWidgets
-
-from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QPushButton, QFileDialog
 import os
-import io
 import xml.etree.ElementTree as ET
-from tqdm.auto import tqdm
-import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import itertools
 import threading
 import time
-import sys
-import pyodbc
 import ast
 import configparser
-import psutil
 import gc
 import traceback
+from contextlib import nullcontext
+from functools import lru_cache
 import linecache
 from difflib import SequenceMatcher
 import csv
+import io
 import re
-import nltk
-from nltk.corpus import words
 import shutil
 import glob
-
-tqdm.pandas()
-
-# Download necessary NLTK resources if not already available, and load English words into a set for quick lookup
-nltk.download('words', quiet=True)
-english_words = set(words.words())
-
-# Read parameters from the config file
-config = configparser.ConfigParser()
-config.read('goaml_config.ini')
-
-reporting_window = config['DEFAULT'].getint('ReportingWindow')
-report_start_date = config['DEFAULT']['ReportStartDate']
-report_end_date = config['DEFAULT']['ReportEndDate']
-ctr_threshold = config['DEFAULT'].getfloat('CTRThreshold')
-report_types = [report_type.strip() for report_type in config.get('DEFAULT', 'ReportTypes').split(',')]
-incorp_number_reg_types = [incorp_number.strip() for incorp_number in config.get('DEFAULT', 'IncorpNumberRegTypes').split(',')]
-invalid_acc_prefixes = [prefix.strip() for prefix in config.get('INVALID_DATA', 'InvalidAccPrefixes').split(',')]
-invalid_acc_chars = [prefix.strip() for prefix in config.get('INVALID_DATA', 'InvalidAccChars').split(',')]
-swift_name_match_threshold = config['DEFAULT'].getfloat('SwiftNameMatchThreshold')
-check_late_submissions = config['DEFAULT'].getboolean('CheckLateSubmissions')
-
-# System control parameters to ensure smooth operation (such as memory management, Excel row limit, etc.)
-memory_threshold_break = config['SYSTEM_DATA'].getint('MemoryThresholdBreak')
-memory_threshold_clean = config['SYSTEM_DATA'].getint('MemoryThresholdGC')
-max_rows_excel = config['SYSTEM_DATA'].getint('MaxRowsExcel')
-
-# Reporting Entity Data
-report_entity_id = config['RE_DATA'].getint('ReportingEntityID')
-report_entity_name = config['RE_DATA'].get('ReportingEntityName')
-report_entity_swift = config['RE_DATA'].get('ReportingEntitySwift')
-
-swift_codes_dict = {}
-with open('./RE_swift_codes.csv', mode='r', encoding='utf-8-sig') as csvfile:
-     reader = csv.reader(csvfile)
-     for row in reader:
-        key, value = row[0], row[1]
-        if key in swift_codes_dict:
-            swift_codes_dict[key].append(value)  # Append to existing list
-        else:
-            swift_codes_dict[key] = [value]  # Create a new list for this key      
-swift_codes = list(swift_codes_dict.keys())
-
-
+import pickle
+import json
+import tempfile
+import hashlib
+import importlib.util
+from collections import Counter, OrderedDict
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from multiprocessing import freeze_support
+
+# Heavy modules (openpyxl, psutil, tqdm, nltk, lxml, pyarrow and PyQt5 for the GUI in goaml_gui.py) are imported in the functions
+# that use them, so that importing this module (for example in worker processes) is fast
+
+# Config file read by default (the command line and the GUI read the file given by --config in its place)
+config_file = 'goaml_config.ini'
+
+# Table to count the digits of account numbers (non ASCII account numbers are counted with digit_pattern)
+digit_delete_table = str.maketrans('', '', '0123456789')
+digit_pattern = re.compile(r'\d')
+
+
+# Settings of a validation: the parameters read from a config file, frozen once they are read
+
+# The settings are built from the raw values of the config file by section (config_values), which is also what they
+# are pickled as when they are sent to worker processes. Settings with some other values (such as the worker count
+# given on the command line, or the data of another reporting entity) are made with with_values()
+class ValidationSettings:
+    def __init__(self, config_values):
+        config = configparser.ConfigParser()
+        config.read_dict(config_values)
+        self.config_values = {section: dict(values) for section, values in config_values.items()}
+        self.config = config
+
+        self.reporting_window = config['DEFAULT'].getint('ReportingWindow')
+        self.report_start_date = config['DEFAULT']['ReportStartDate']
+        self.report_end_date = config['DEFAULT']['ReportEndDate']
+        # Report start and end dates parsed once as day ordinals for the date checks
+        self.report_start_day = get_config_day(config, 'ReportStartDate')
+        self.report_end_day = get_config_day(config, 'ReportEndDate')
+        # Reports with a submission date outside the report start and end dates are skipped before they are parsed
+        self.skip_reports_outside_dates = config['DEFAULT'].getboolean('SkipReportsOutsideDates', fallback=False)
+        # Reports of other reporting entities (rentity_id in the report header) are skipped before they are parsed
+        self.skip_other_reporting_entities = config['DEFAULT'].getboolean('SkipOtherReportingEntities', fallback=False)
+        self.ctr_threshold = config['DEFAULT'].getfloat('CTRThreshold')
+        self.report_types = [report_type.strip() for report_type in config.get('DEFAULT', 'ReportTypes').split(',')]
+        self.incorp_number_reg_types = [incorp_number.strip() for incorp_number in config.get('DEFAULT', 'IncorpNumberRegTypes').split(',')]
+        self.invalid_acc_prefixes = [prefix.strip() for prefix in config.get('INVALID_DATA', 'InvalidAccPrefixes').split(',')]
+        self.invalid_acc_chars = [prefix.strip() for prefix in config.get('INVALID_DATA', 'InvalidAccChars').split(',')]
+        # Account number checks compiled once: a match of the prefixes (at the start) or characters (anywhere) of the lists above
+        self.invalid_acc_prefix_pattern = re.compile('|'.join(re.escape(prefix) for prefix in sorted(self.invalid_acc_prefixes, key=len, reverse=True)))
+        self.invalid_acc_char_pattern = re.compile('|'.join(re.escape(char) for char in sorted(self.invalid_acc_chars, key=len, reverse=True)))
+        self.swift_name_match_threshold = config['DEFAULT'].getfloat('SwiftNameMatchThreshold')
+        self.check_late_submissions = config['DEFAULT'].getboolean('CheckLateSubmissions')
+
+        # System control parameters to ensure smooth operation (such as memory management, Excel row limit, etc.)
+        self.memory_threshold_break = config['SYSTEM_DATA'].getint('MemoryThresholdBreak')
+        self.memory_threshold_clean = config['SYSTEM_DATA'].getint('MemoryThresholdGC')
+        self.max_rows_excel = config['SYSTEM_DATA'].getint('MaxRowsExcel')
+        # Number of worker processes used to validate XML files (1 = validate serially in this process, 0 = one per CPU core)
+        self.validation_workers = config['SYSTEM_DATA'].getint('ValidationWorkers', fallback=1)
+        if self.validation_workers <= 0:
+            self.validation_workers = os.cpu_count() or 1
+        # Detach each validated transaction from the parsed tree, so that memory used for a report does not grow with its size
+        self.streaming_parse = config['SYSTEM_DATA'].getboolean('StreamingParse', fallback=True)
+        # XML parser used for reports: lxml (if it is installed), etree (xml.etree.ElementTree), or auto (etree, which
+        # validates the reports faster and with less memory than lxml)
+        self.parser_engine = config['SYSTEM_DATA'].get('ParserEngine', fallback='auto').strip().lower()
+        # Number of swift code and institution name match results kept in memory (0 = not cached)
+        self.swift_match_cache_size = config['SYSTEM_DATA'].getint('SwiftMatchCacheSize', fallback=10000)
+        # Number of person, entity and account validation results cached in memory (0 = no cache)
+        self.validation_cache_size = config['SYSTEM_DATA'].getint('ValidationCacheSize', fallback=10000)
+        # Store of the fingerprints of valid persons, entities and accounts kept between runs (empty = no store), and its size
+        self.known_good_store_file = config['SYSTEM_DATA'].get('KnownGoodStore', fallback='').strip()
+        self.known_good_store_size = config['SYSTEM_DATA'].getint('KnownGoodStoreSize', fallback=200000)
+        # File holding the prebuilt reference data (English words automaton and swift codes), rebuilt when its sources change
+        self.reference_data_cache_file = config['SYSTEM_DATA'].get('ReferenceDataCache', fallback='goaml_reference_data.cache')
+        # Number of bytes read from the start of an XML file to find the elements of its report header
+        self.report_header_read_size = config['SYSTEM_DATA'].getint('ReportHeaderReadSize', fallback=65536)
+        # Output files of the reporting issues: csv, xlsx (the first MaxRowsExcel issues) and parquet (if pyarrow is installed)
+        self.output_formats = [output_format.strip().lower() for output_format in config['SYSTEM_DATA'].get('OutputFormats', fallback='csv, xlsx, parquet').split(',') if output_format.strip()]
+        # Manifest of the validated XML files and their issues. Files that have not changed since the last run are not validated again
+        self.validation_manifest_file = config['SYSTEM_DATA'].get('ValidationManifest', fallback='goaml_validation_manifest.cache').strip()
+        # Folder of the issues files of the XML files in the validation manifest (replayed for unchanged files)
+        self.validation_issues_folder = f'{os.path.splitext(self.validation_manifest_file)[0]}_issues' if self.validation_manifest_file else ''
+
+        # lxml is optional. Reports are parsed with xml.etree.ElementTree if it is not installed (or not selected)
+        self.use_lxml = self.parser_engine == 'lxml' and importlib.util.find_spec('lxml') is not None
+        # pyarrow is optional. Reporting issues are also saved to a Parquet file if it is installed
+        self.use_pyarrow = importlib.util.find_spec('pyarrow') is not None
+
+        # Reporting Entity Data
+        self.report_entity_id = config['RE_DATA'].getint('ReportingEntityID')
+        self.report_entity_name = config['RE_DATA'].get('ReportingEntityName')
+        self.report_entity_swift = config['RE_DATA'].get('ReportingEntitySwift')
+
+        self.frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, 'frozen', False):
+            raise AttributeError(f'validation settings are frozen, use with_values() to change {name}')
+        super().__setattr__(name, value)
+
+    def __reduce__(self):
+        return ValidationSettings, (self.config_values,)
+
+    # Returns settings with the given config values changed (raw values by section and key, as in the config file)
+    def with_values(self, changed_values):
+        config_values = {section: dict(values) for section, values in self.config_values.items()}
+        for section, values in changed_values.items():
+            config_values.setdefault(section, {}).update((self.config.optionxform(key), str(value)) for key, value in values.items())
+        return ValidationSettings(config_values)
+
+
+# Function to read a date of the DEFAULT section of a config file (in a format read by parse_date) as a day ordinal
+def get_config_day(config, key):
+    config_date = parse_date_details(config['DEFAULT'][key].strip())
+    if config_date is None:
+        raise ValueError(f'{key} is not a date in the format YYYY-MM-DD: {config["DEFAULT"][key]}')
+    return config_date.toordinal()
+
+
+# Function to read the validation settings from a config file
+def load_settings(config_file_path):
+    config = configparser.ConfigParser()
+    config.read(config_file_path)
+    config_values = {'DEFAULT': dict(config.defaults())}
+    for section in config.sections():
+        config_values[section] = {key: value for key, value in config.items(section, raw=True)
+                                  if key not in config.defaults() or value != config.defaults()[key]}
+    return ValidationSettings(config_values)
+
+
+# Reference data used by the validators: the automaton of English words (from the NLTK words corpus), and the
+# institution names of swift codes (from RE_swift_codes.csv). They are loaded on first use by load_reference_data()
+english_word_automaton = None
+swift_codes_dict = None
+swift_prefix_lengths = None
+swift_name_index = None
+# Lock of the reference data, loaded once for all sessions (such as sessions validated on several threads)
+reference_data_lock = threading.Lock()
+# Version of the reference data cache file format (with the length limits of the English words automaton)
+reference_data_cache_version = (1, 5, 34)
+# Version of the validation manifest file format
+validation_manifest_version = 2
+# Version of the known-good store file format
+known_good_store_version = 1
+# Number of parsed dates and validated NICs kept in memory (by lru_cache, which is thread safe and shared by all
+# validation sessions)
+value_memo_size = 10000
 
 # Global variables used in validator functions and main function
 issues_file_name = ''
 
-# Specify the local folder path where XML files should be saved
-local_folder_path = ''
-output_path=''
-reporting_issues = []
-issues_upload_ids = []
+# Columns of the reporting issues files (one row for each issue of an element)
+issue_columns = ('report_name', 'transaction_number', 'category', 'element', 'issue', 'CDS details')
+# Number of issues written to each row group of the Parquet issues file
+parquet_row_group_size = 50000
+
+# Tags of the XML report elements read by process_report (other elements are read as children of a <transaction>)
+report_element_tags = ('report_code', 'submission_date', 'transaction')
+# Tags of the XML report header elements read before a report is parsed, to skip the reports that are not validated
+report_header_tags = ('rentity_id', 'report_code', 'submission_date')
+# Size of the chunks read from an XML file by read_report_header
+report_header_chunk_size = 4096
+# Size of the chunks of an XML report fed to the etree parser (as by ET.iterparse)
+report_parse_chunk_size = 16 * 1024
+
 
-details=''
+# Minimum number of seconds between the progress updates of a run (sent to the progress_callback of its session)
+progress_interval = 0.5
 
 
-def memory_usage():
+# Function to get the memory usage of the process in MB, with the memory of its worker processes if include_workers
+def memory_usage(include_workers=False):
+    import psutil
     process = psutil.Process()
-    return process.memory_info().rss / (1024 * 1024)  # Convert bytes to MB
+    rss = process.memory_info().rss
+    if include_workers:
+        for child_process in process.children(recursive=True):
+            try:
+                rss += child_process.memory_info().rss
+            except psutil.Error:
+                pass  # The worker process has ended
+    return rss / (1024 * 1024)  # Convert bytes to MB
+
+
+# Least recently used cache holding up to maxsize entries (nothing is cached if maxsize is 0)
+# Counts the hits and misses of lookups, which are shown in the run summary
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Returns the cached value of the key, or None if it is not cached
+    def get(self, key):
+        if self.maxsize <= 0:
+            return None
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        # Evict the least recently used entries
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+# Class holding the values shared by all issues of a transaction (set once for each transaction)
+class TransactionContext:
+    __slots__ = ('report_name', 'transaction_number', 'cds_details')
+
+    def __init__(self, report_name, transaction_number, cds_details):
+        self.report_name = report_name
+        self.transaction_number = transaction_number
+        self.cds_details = cds_details
+
+
+# Class holding a reporting issue of a transaction (the columns of issue_columns)
+
+# The report name, transaction number and CDS details are taken from the transaction context instead of being copied
+# to each issue, and the category and element names are interned, so each issue only holds references
+class Issue:
+    __slots__ = ('context', 'category', 'element', 'issue')
+
+    def __init__(self, context, category, element, issue):
+        self.context = context
+        self.category = sys.intern(category)
+        self.element = sys.intern(element)
+        self.issue = issue
+
+
+# Class to write reporting issues to a CSV file as they are found, and to a Parquet file if a path is given
+
+# The validators append Issue records (as to a list). Each issue is flattened when it is appended: a list of
+# issues of an element (or the string form of the list) is written as one row for each issue. Only the rows of the
+# current Parquet row group are held in memory, so memory does not grow with the number of issues.
+# Issues files of single XML files are written without header, and appended to the issues file of the run
+class IssueSink:
+    def __init__(self, csv_path, parquet_path=None, header=True):
+        self.row_count = 0
+        self.csv_file = open(csv_path, 'w', newline='', encoding='utf-8')
+        self.csv_writer = csv.writer(self.csv_file)
+        if header:
+            self.csv_writer.writerow(issue_columns)
+        self.parquet_path = parquet_path
+        self.parquet_writer = None
+        self.parquet_rows = []
+
+    def append(self, issue):
+        issue_texts = parse_list(issue.issue) or [None]
+        context = issue.context
+        rows = [(context.report_name, context.transaction_number, issue.category, issue.element, issue_text,
+                 context.cds_details) for issue_text in issue_texts]
+        self.csv_writer.writerows(rows)
+        self.row_count += len(rows)
+        if self.parquet_path is not None:
+            self.add_parquet_rows(rows)
+
+    # Append the rows of the issues file of a single XML file (row_count is the number of rows in the file)
+    def append_file(self, issues_file_path, row_count):
+        with open(issues_file_path, 'r', newline='', encoding='utf-8') as issues_file:
+            if self.parquet_path is None:
+                shutil.copyfileobj(issues_file, self.csv_file)
+            else:
+                issues_reader = csv.reader(issues_file)
+                for rows in iter(lambda: list(itertools.islice(issues_reader, parquet_row_group_size)), []):
+                    self.csv_writer.writerows(rows)
+                    self.add_parquet_rows(rows)
+        self.row_count += row_count
+
+    # Empty values are saved as nulls in the Parquet file (as in the Excel file)
+    def add_parquet_rows(self, rows):
+        self.parquet_rows.extend([None if value is None or value == '' else str(value) for value in row] for row in rows)
+        if len(self.parquet_rows) >= parquet_row_group_size:
+            self.write_parquet_rows()
+
+    def write_parquet_rows(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(column, pa.string()) for column in issue_columns])
+        if self.parquet_writer is None:
+            self.parquet_writer = pq.ParquetWriter(self.parquet_path, schema)
+        columns = list(zip(*self.parquet_rows))
+        self.parquet_writer.write_table(pa.Table.from_arrays([pa.array(column, pa.string()) for column in columns], schema=schema))
+        self.parquet_rows = []
+
+    def close(self):
+        self.csv_file.close()
+        if self.parquet_rows:
+            self.write_parquet_rows()
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+# Class to keep the upload ids of reports with issues once each, in the order they are first added
+# (the validators append the upload id of the report for each issue)
+class UploadIdSet(dict):
+    def append(self, upload_id):
+        self[upload_id] = None
+
+
+# Index of the rows of an issues CSV file, to read the issues on demand (such as the issue browser of the GUI)
+
+# The file is read once to record the byte offset of each row, and the codes of its values in index_columns (used to
+# filter and sort the rows). The rows themselves are read from the file in pages when they are shown, and the last
+# pages read are kept in an LRU cache, so memory does not grow with the number of issues beyond the offsets and codes.
+# The view is the list of row numbers shown (all rows in file order, or filtered and sorted by index_columns)
+class IssueFileIndex:
+    index_columns = ('report_name', 'category', 'element')
+    page_size = 500
+
+    def __init__(self, issues_csv_path, page_cache_size=20):
+        self.issues_csv_path = issues_csv_path
+        self.offsets = array('Q')
+        self.values = {column: [] for column in self.index_columns}
+        self.codes = {column: array('I') for column in self.index_columns}
+        self.pages = LRUCache(page_cache_size)
+        self.view = None
+        self.read_index()
+
+    # Read the offsets and index column codes of the rows. The csv reader reads the lines of the file one at a time,
+    # so the offset after the lines of a row is the start of the next row (rows may have line breaks in quoted values)
+    def read_index(self):
+        offset = 0
+
+        def read_lines(issues_file):
+            nonlocal offset
+            for line in issues_file:
+                offset += len(line)
+                yield line.decode('utf-8')
+
+        with open(self.issues_csv_path, 'rb') as issues_file:
+            issues_reader = csv.reader(read_lines(issues_file))
+            self.columns = next(issues_reader, list(issue_columns))
+            index_positions = [(self.columns.index(column), self.codes[column], self.values[column], {})
+                               for column in self.index_columns]
+            row_offset = offset
+            for row in issues_reader:
+                self.offsets.append(row_offset)
+                for position, codes, values, value_codes in index_positions:
+                    value = row[position] if position < len(row) else ''
+                    code = value_codes.get(value)
+                    if code is None:
+                        code = value_codes[value] = len(values)
+                        values.append(value)
+                    codes.append(code)
+                row_offset = offset
+            self.offsets.append(row_offset)
+
+    def __len__(self):
+        return len(self.view) if self.view is not None else len(self.offsets) - 1
+
+    # Distinct values of an index column, in sorted order
+    def column_values(self, column):
+        return sorted(self.values[column])
+
+    # Set the rows of the view: the rows with the given values of index columns (filters by column name), sorted
+    # by an index column (the order of the file is kept for rows with the same value)
+    def set_view(self, filters=None, sort_column=None, descending=False):
+        rows = range(len(self.offsets) - 1)
+        for column, value in (filters or {}).items():
+            if value not in self.values[column]:
+                rows = []
+                break
+            codes, code = self.codes[column], self.values[column].index(value)
+            rows = [row for row in rows if codes[row] == code]
+        if sort_column is not None:
+            ranks = array('I', bytes(4 * len(self.values[sort_column])))
+            for rank, code in enumerate(sorted(range(len(ranks)), key=self.values[sort_column].__getitem__)):
+                ranks[code] = rank
+            codes = self.codes[sort_column]
+            rows = sorted(rows, key=lambda row: ranks[codes[row]], reverse=descending)
+        self.view = None if isinstance(rows, range) else array('I', rows)
+        self.pages = LRUCache(self.pages.maxsize)
+
+    # Returns the values of the row at a position of the view
+    def row(self, position):
+        page_number = position // self.page_size
+        page = self.pages.get(page_number)
+        if page is None:
+            start = page_number * self.page_size
+            end = min(start + self.page_size, len(self))
+            page = self.read_rows(range(start, end) if self.view is None else self.view[start:end])
+            self.pages.put(page_number, page)
+        return page[position - page_number * self.page_size]
+
+    # Read rows of the file, with one read for each run of consecutive rows
+    def read_rows(self, rows):
+        page = []
+        with open(self.issues_csv_path, 'rb') as issues_file:
+            for _, run in itertools.groupby(enumerate(rows), key=lambda item: item[1] - item[0]):
+                run = [row for _, row in run]
+                issues_file.seek(self.offsets[run[0]])
+                text = issues_file.read(self.offsets[run[-1] + 1] - self.offsets[run[0]]).decode('utf-8')
+                page.extend(csv.reader(io.StringIO(text, newline='')))
+        return page
+
+
+# Store of the fingerprints of persons, entities and accounts that were valid in previous runs
+
+# The 64-bit hashes of the validation cache keys (fingerprint and validator inputs) are held in a sorted array and
+# looked up by binary search, so the store is compact and has no false positives in practice. The store is only used
+# with the validation settings it was written with (validation_config_hash, which includes the English words list).
+# Each hash keeps the number of the last run it was seen in, and the least recently seen are dropped above maxsize.
+# Counts the hits and misses of lookups, which are shown in the run summary (as the validation caches)
+class KnownGoodStore:
+    def __init__(self, store_file, maxsize, settings):
+        self.store_file = store_file
+        self.maxsize = maxsize
+        self.settings = settings
+        self.enabled = bool(store_file) and maxsize > 0
+        self.loaded = False
+        self.store_hash = None
+        self.run = 0
+        self.hashes = array('Q')
+        self.last_seen = array('I')
+        # Hashes found or added in this run (sent back by worker processes with their results)
+        self.seen = set()
+        self.hits = 0
+        self.misses = 0
+
+    # Hash of the validation settings the store is valid for
+    def get_store_hash(self):
+        return validation_config_hash(self.settings)
+
+    def load(self):
+        self.loaded = True
+        self.store_hash = self.get_store_hash()
+        try:
+            with open(self.store_file, 'rb') as store_file:
+                store = pickle.load(store_file)
+            if store.get('version') == known_good_store_version and store.get('store_hash') == self.store_hash:
+                self.run = store['run']
+                self.hashes = store['hashes']
+                self.last_seen = store['last_seen']
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+            pass
+
+    @staticmethod
+    def key_hash(key):
+        return int.from_bytes(hashlib.blake2b(repr(key).encode('utf-8'), digest_size=8).digest(), 'little')
+
+    def contains(self, key_hash):
+        if not self.loaded:
+            self.load()
+        index = bisect_left(self.hashes, key_hash)
+        if index < len(self.hashes) and self.hashes[index] == key_hash:
+            self.hits += 1
+            self.seen.add(key_hash)
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, key_hash):
+        self.seen.add(key_hash)
+
+    # Save the hashes seen in this run with the hashes of the store, keeping the most recently seen up to maxsize
+    def save(self):
+        if not self.seen:
+            return
+        if not self.loaded:
+            self.load()
+        run = self.run + 1
+        entries = [(key_hash, run if key_hash in self.seen else last_seen) for key_hash, last_seen in zip(self.hashes, self.last_seen)]
+        stored = set(self.hashes)
+        entries.extend((key_hash, run) for key_hash in self.seen if key_hash not in stored)
+        if len(entries) > self.maxsize:
+            entries.sort(key=lambda entry: entry[1], reverse=True)
+            del entries[self.maxsize:]
+        entries.sort()
+        self.run = run
+        self.hashes = array('Q', [entry[0] for entry in entries])
+        self.last_seen = array('I', [entry[1] for entry in entries])
+        self.seen = set()
+        write_cache_file(self.store_file, {'version': known_good_store_version, 'store_hash': self.store_hash,
+                                           'run': self.run, 'hashes': self.hashes, 'last_seen': self.last_seen})
+
+    # Remove the store file (the invalidation command --clear-known-good-store)
+    def clear(self):
+        self.loaded = True
+        self.run = 0
+        self.hashes = array('Q')
+        self.last_seen = array('I')
+        self.seen = set()
+        try:
+            os.remove(self.store_file)
+        except OSError:
+            pass
+
+
+# Session of a validation: the settings, the caches and rule plans of the validators, and the results of a run
+
+# Each session holds its own state, so sessions (such as the reporting entities validated in one process) share
+# nothing but the reference data. The results of a run (issues, upload ids, parse statistics and details) are
+# collected in the session, and the run is cancelled with its cancel_event.
+# A session is pickled as its settings: a worker process validates with its own session of the same settings
+# (get_worker_session), which keeps its caches for all files validated by the worker
+class ValidationSession:
+    def __init__(self, settings):
+        self.settings = settings
+        # Input folder of the XML files and output folder of the run
+        self.local_folder_path = ''
+        self.output_path = ''
+
+        # Cache of swift code and institution name match results, which repeat across many accounts
+        self.swift_match_cache = LRUCache(settings.swift_match_cache_size)
+        # Caches of person, entity and account validation results, by the fingerprint of the validated element
+        self.person_validation_cache = LRUCache(settings.validation_cache_size)
+        self.entity_validation_cache = LRUCache(settings.validation_cache_size)
+        self.account_validation_cache = LRUCache(settings.validation_cache_size)
+        # Store of valid persons, entities and accounts of previous runs
+        self.known_good_store = KnownGoodStore(settings.known_good_store_file, settings.known_good_store_size, settings)
+        # Caches used by the validators, by the name shown in the run summary
+        self.validation_caches = {'SWIFT match cache': self.swift_match_cache, 'Person validation cache': self.person_validation_cache,
+                                  'Entity validation cache': self.entity_validation_cache, 'Account validation cache': self.account_validation_cache,
+                                  'Known-good store': self.known_good_store}
+        # Compiled rule plans by report code
+        self.rule_plans = {}
+
+        # Results of the run: issues and upload ids of the reports with issues (IssueSink and UploadIdSet during a
+        # run), number of transactions and peak number of parsed elements held in memory for each validated report,
+        # details shown to the user, issues CSV file (empty if no issues were found) and summary of the run
+        self.reporting_issues = []
+        self.issues_upload_ids = []
+        self.report_parse_stats = []
+        self.details = ''
+        self.issues_csv_file = ''
+        self.run_summary = {}
+
+        # Function called with the progress of a run (set by the GUI, None = progress is only shown on the console),
+        # and the event that cancels a run (the files validated so far are saved)
+        self.progress_callback = None
+        self.cancel_event = threading.Event()
+        # Pool of worker processes shared by the sessions of a batch run (None = a pool is started for each run)
+        self.worker_pool = None
+
+    def __reduce__(self):
+        return get_worker_session, (self.settings,)
+
+
+# Sessions of the worker processes by their settings (the most recently used worker_sessions_size sessions, as a worker
+# of a batch run validates the files of many reporting entities), and the session of the config file (used if no session
+# is given)
+worker_sessions = OrderedDict()
+worker_sessions_size = 8
+default_session = None
+# Sessions running a validation in this process (several sessions can run at the same time on different threads)
+running_sessions = set()
+
+
+# Function to get the session of a worker process for the settings of the session it was sent from
+def get_worker_session(settings):
+    key = repr(sorted((section, sorted(values.items())) for section, values in settings.config_values.items()))
+    session = worker_sessions.get(key)
+    if session is None:
+        session = worker_sessions[key] = ValidationSession(settings)
+        if len(worker_sessions) > worker_sessions_size:
+            worker_sessions.popitem(last=False)
+    else:
+        worker_sessions.move_to_end(key)
+    return session
+
+
+# Function to get the session of the default config file (config_file), created on first use
+def get_default_session():
+    global default_session
+    if default_session is None:
+        default_session = ValidationSession(load_settings(config_file))
+    return default_session
+
 
 # Helper function to check if a string is considered valid
 def is_valid(value):
     return value is not None and value.strip() != ''
 
-# Helper function to parse a date in the format 'YYYY-MM-DDTHH:MM:SS'
+# Dates of the reports (submission_date) and transactions (date_transaction) in the formats read by parse_date, with
+# ASCII digits. Dates matching it are converted with date.fromisoformat instead of strptime
+iso_date_pattern = re.compile(r'([0-9]{4}-[0-9]{2}-[0-9]{2})(?:T([0-9]{2}):([0-9]{2}):([0-9]{2}))?(?:\..*)?', re.DOTALL)
+
+# Helper function to parse a date in the format 'YYYY-MM-DDTHH:MM:SS'. The same timestamps repeat across the transactions
+# of a report, so the value_memo_size most recently parsed dates are kept
+@lru_cache(maxsize=value_memo_size)
 def parse_date(date_string):
+    return parse_date_details(date_string)
+
+
+# Helper function to parse a date (not cached, see parse_date). Dates matching iso_date_pattern are parsed with
+# date.fromisoformat (the time must be valid for strptime, otherwise the date is not valid), others with strptime
+def parse_date_details(date_string):
+    iso_date = iso_date_pattern.fullmatch(date_string) if date_string is not None else None
+    if iso_date is not None:
+        hour, minute, second = iso_date.group(2, 3, 4)
+        if hour is not None and (hour > '23' or minute > '59' or second > '59'):
+            return None
+        try:
+            return date.fromisoformat(iso_date.group(1))
+        except ValueError:
+            return None
+
     # Remove the fractional part of the timestamp if it exists
     date_string = date_string.split('.')[0]  # Keep only the part before the decimal point
     
@@ -139,40 +677,287 @@ def parse_list(val):
     else:
         # For NaN or other types, return an empty list
         return []
-    
-# Helper function to identify words in a string (account number)
-def find_english_words(text):
-    found_words = set()
 
-    # Convert to uppercase for consistent checking, as word list might be in lowercase
-    text = text.upper()
 
-    # Check every possible substring that is longer than 4 characters
-    for start in range(len(text)):
-        for end in range(start + 5, len(text) + 1):  # start + 5 ensures minimum length of 5
-            substring = text[start:end]
-            if substring.lower() in english_words:
-                found_words.add(substring)
+# Automaton (Aho-Corasick) of English words used to detect words in account numbers
+
+# Holds the lower case words of the word list with at least 5 characters and not longer than max_length, as a trie in
+# compact arrays: the children of node n are child_labels / child_ids[child_start[n]:child_start[n + 1]] (sorted by
+# their byte). Each node also has a failure link to the node of its longest proper suffix in the trie, so that a text
+# is scanned in a single pass, without going back to each start position
+class WordAutomaton:
+    def __init__(self, child_start, child_labels, child_ids, fail, terminal):
+        self.child_start = child_start
+        self.child_labels = child_labels
+        self.child_ids = child_ids
+        self.fail = fail
+        self.terminal = terminal
+
+    # Arrays of the automaton, which are stored in the reference data cache file
+    def arrays(self):
+        return self.child_start, self.child_labels, self.child_ids, self.fail, self.terminal
+
+    # Builds the automaton of a word list
+    @classmethod
+    def from_words(cls, word_list, min_length=5, max_length=34):
+        word_bytes = sorted({word.encode('utf-8') for word in word_list
+                             if min_length <= len(word) <= max_length and word == word.lower()})
+
+        # Build the trie from the sorted words. Each new node records its parent, edge byte and depth
+        parents = array('i', [0])
+        labels = bytearray(1)
+        depths = array('i', [0])
+        terminal = bytearray(1)
+        path = [0]
+        previous = b''
+        for word in word_bytes:
+            # Reuse the nodes of the prefix shared with the previous word
+            common = 0
+            limit = min(len(word), len(previous))
+            while common < limit and word[common] == previous[common]:
+                common += 1
+            del path[common + 1:]
+            node = path[-1]
+            for depth in range(common, len(word)):
+                parents.append(node)
+                labels.append(word[depth])
+                depths.append(depth + 1)
+                terminal.append(0)
+                node = len(labels) - 1
+                path.append(node)
+            terminal[node] = 1
+            previous = word
+
+        # Group the children of each node (nodes were created in sorted order, so children stay sorted by byte)
+        node_count = len(labels)
+        child_start = array('i', [0]) * (node_count + 1)
+        for node in range(1, node_count):
+            child_start[parents[node] + 1] += 1
+        for node in range(node_count):
+            child_start[node + 1] += child_start[node]
+        child_labels = bytearray(node_count - 1)
+        child_ids = array('i', [0]) * (node_count - 1)
+        next_slot = array('i', child_start)
+        for node in range(1, node_count):
+            slot = next_slot[parents[node]]
+            next_slot[parents[node]] += 1
+            child_labels[slot] = labels[node]
+            child_ids[slot] = node
+        child_labels = bytes(child_labels)
+
+        # Failure links, computed in order of depth (the failure node of a node is always less deep)
+        fail = array('i', [0]) * node_count
+        for node in sorted(range(1, node_count), key=depths.__getitem__):
+            parent = parents[node]
+            if parent == 0:
+                continue
+            label = labels[node]
+            state = fail[parent]
+            while True:
+                slot = child_labels.find(label, child_start[state], child_start[state + 1])
+                if slot >= 0:
+                    fail[node] = child_ids[slot]
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            # A node is terminal if any suffix ending at it is a word
+            terminal[node] |= terminal[fail[node]]
+
+        return cls(child_start, child_labels, child_ids, fail, bytes(terminal))
+
+    # Returns True at the first word found in the text (case insensitive)
+    def contains_word(self, text):
+        child_start = self.child_start
+        child_labels = self.child_labels
+        child_ids = self.child_ids
+        fail = self.fail
+        terminal = self.terminal
+
+        state = 0
+        for label in text.upper().lower().encode('utf-8'):
+            while True:
+                slot = child_labels.find(label, child_start[state], child_start[state + 1])
+                if slot >= 0:
+                    state = child_ids[slot]
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            if terminal[state]:
+                return True
+        return False
+
+
+# Function to load the English words of the NLTK words corpus
+
+# Returns the word list and the path of the corpus file (used to detect changes of the corpus), or an empty word list
+# if the corpus is not installed. The corpus is never downloaded by a validation run, it is installed with
+# main.py --download-nltk-words
+def load_nltk_words():
+    import nltk
+    from nltk.corpus import words
+
+    try:
+        corpus = nltk.data.find('corpora/words')
+    except LookupError:
+        return [], None
+
+    if hasattr(corpus, 'zipfile'):
+        corpus_path = corpus.zipfile.filename
+    else:
+        corpus_path = os.path.join(corpus.path, 'en') if os.path.exists(os.path.join(corpus.path, 'en')) else corpus.path
+    return words.words(), corpus_path
+
+
+# Function to download the NLTK words corpus (main.py --download-nltk-words), returns True if it was installed
+def download_nltk_words():
+    import nltk
+
+    return nltk.download('words', quiet=True)
+
+
+# Helper function to get the path, size and modification time of a file, or None if it does not exist
+def file_signature(path):
+    if path is None:
+        return None
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), file_stat.st_size, file_stat.st_mtime_ns)
+
+
+# Helper function to get the SHA-256 hash of the content of a file
+def file_content_hash(path):
+    content_hash = hashlib.sha256()
+    with open(path, 'rb') as content_file:
+        for chunk in iter(lambda: content_file.read(1024 * 1024), b''):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+# Function to save data to a cache file
+
+# The data is written to a temporary file first, so that other processes never read a partly written cache.
+# A cache that cannot be written is not an error (it is built again on the next run)
+def write_cache_file(cache_file_path, data):
+    temp_cache_file = f'{cache_file_path}.{os.getpid()}.tmp'
+    try:
+        with open(temp_cache_file, 'wb') as cache_file:
+            pickle.dump(data, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_cache_file, cache_file_path)
+    except OSError:
+        try:
+            os.remove(temp_cache_file)
+        except OSError:
+            pass
+
+
+# Function to read the institution names of swift codes from RE_swift_codes.csv
+def read_swift_codes(swift_codes_file):
+    swift_codes = {}
+    with open(swift_codes_file, mode='r', encoding='utf-8-sig') as csvfile:
+        reader = csv.reader(csvfile)
+        for row in reader:
+            key, value = row[0], row[1]
+            if key in swift_codes:
+                swift_codes[key].append(value)  # Append to existing list
+            else:
+                swift_codes[key] = [value]  # Create a new list for this key
+    return swift_codes
+
+
+# Function to load the reference data used by the validators (on first use)
+
+# The English words automaton and the swift codes are read from the reference data cache file (ReferenceDataCache
+# in goaml_config.ini), which loads in milliseconds. Each of them is rebuilt from its source (NLTK words corpus or
+# RE_swift_codes.csv) if the cache does not have it or the source file has changed since the cache was written.
+# If a source file is not available (such as the NLTK corpus on hosts without internet access), the cached data is used.
+# The reference data is shared by all sessions of the process, and loaded once (by the first session that needs it)
+def load_reference_data(reference_data_cache_file):
+    if english_word_automaton is not None:
+        return
+    with reference_data_lock:
+        if english_word_automaton is None:
+            load_reference_data_files(reference_data_cache_file)
+
+
+# Function to read the reference data from the cache file, or rebuild it from its sources (called by load_reference_data)
+def load_reference_data_files(reference_data_cache_file):
+    global english_word_automaton, swift_codes_dict, swift_prefix_lengths, swift_name_index
+
+    try:
+        with open(reference_data_cache_file, 'rb') as cache_file:
+            cache = pickle.load(cache_file)
+        if cache.get('version') != reference_data_cache_version:
+            cache = {}
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        cache = {}
+    cache_changed = False
+
+    # Automaton of the English words used to check account numbers in a single pass
+    words_source = cache.get('words_source')
+    if 'word_automaton' in cache and file_signature(words_source and words_source[0]) in (words_source, None):
+        word_automaton = WordAutomaton(*cache['word_automaton'])
+    else:
+        word_list, corpus_path = load_nltk_words()
+        word_automaton = WordAutomaton.from_words(word_list)
+        # Nothing is cached without the corpus, so that it is loaded again once it is installed
+        if corpus_path is not None:
+            cache['words_source'] = file_signature(corpus_path)
+            cache['word_automaton'] = word_automaton.arrays()
+            cache_changed = True
+
+    # Institution names of swift codes
+    swift_codes_file = './RE_swift_codes.csv'
+    swift_source = file_signature(swift_codes_file)
+    if 'swift_codes' in cache and swift_source in (cache.get('swift_source'), None):
+        swift_codes_dict = cache['swift_codes']
+    else:
+        swift_codes_dict = read_swift_codes(swift_codes_file)
+        cache['swift_source'] = swift_source
+        cache['swift_codes'] = swift_codes_dict
+        cache_changed = True
+
+    # Index used to match swift codes with institution names. The institution names of each swift code prefix are
+    # lower cased once here, with their character counts (for the quick_ratio bound of the match). The index is only
+    # read by the validators, so it is shared by the sessions of all threads
+    swift_prefix_lengths = sorted({len(key) for key in swift_codes_dict})
+    swift_name_index = {}
+    for key, values in swift_codes_dict.items():
+        swift_name_index[key] = []
+        for value in values:
+            name_lower = value.lower()
+            swift_name_index[key].append((name_lower, Counter(name_lower)))
+
+    if cache_changed:
+        cache['version'] = reference_data_cache_version
+        write_cache_file(reference_data_cache_file, cache)
+
+    # Set last, as it marks the reference data as loaded
+    english_word_automaton = word_automaton
 
-    return found_words
     
 # Function to validate the transaction date
-def is_valid_transaction_date(transaction_date, submission_date):
+def is_valid_transaction_date(transaction_date, submission_date, report_start_day):
     if transaction_date is not None and submission_date is not None:
-        # Transaction date cannot be after submission date, or before goAML reporting start date (01/01/2022)
-        return (transaction_date <= submission_date) & (transaction_date >= parse_date('2022-01-01'))
+        # Transaction date cannot be after submission date, or before the report start date (ReportStartDate)
+        return report_start_day <= transaction_date.toordinal() <= submission_date.toordinal()
     return False
 
 # Function to check late submissions
-def is_late_submission(transaction_date, submission_date):
+def is_late_submission(transaction_date, submission_date, reporting_window):
     if transaction_date is not None and submission_date is not None:
-        # Submission date should be within 31 days from transaction date
-        diff = submission_date - transaction_date
-        diff_days = diff.days
+        # Submission date should be within the reporting window (31 days) from transaction date
+        diff_days = submission_date.toordinal() - transaction_date.toordinal()
         return (diff_days > reporting_window)
        
-# Function to validate ssn  
-def validate_ssn(tpe_ssn):
+# Function to validate ssn (NIC) formats:
+# 1. 9 numbers + English letter: year 10-99, day of year 001-366 (501-866 for females), V or X at the end, where the
+#    letter may be separated by a space
+# 2. 12 numbers: year 1910-2010, day of year 001-366 (501-866 for females)
+def validate_ssn_details(tpe_ssn):
     if tpe_ssn is None:
         return False
 
@@ -193,137 +978,83 @@ def validate_ssn(tpe_ssn):
 
     return False
        
+# Function to validate ssn. NICs repeat across many persons and transactions, so the results of the value_memo_size most
+# recently validated NICs are kept
+@lru_cache(maxsize=value_memo_size)
+def validate_ssn(tpe_ssn):
+    return validate_ssn_details(tpe_ssn)
+
+
 # Function to check whether a transaction has accounts in both From and To sides
-def is_accounts_both_side(transaction):
-    is_from_account = False
-    is_to_account = False
-    
+def is_accounts_both_side(view):
     # Not checking the From and To sides if transaction is multi-party. Simply return true
-    involved_parties = transaction.find('involved_parties')
-    if involved_parties is not None:
+    if view.involved_parties is not None:
         return False
-    
-    t_from_my_client = transaction.find('t_from_my_client')
-    t_from = transaction.find('t_from')
-    t_to_my_client = transaction.find('t_to_my_client')
-    t_to = transaction.find('t_to')
-    
-    if t_from_my_client is not None:
-        from_account = t_from_my_client.find('from_account')
-        if from_account is not None:
-            is_from_account = True
-    
-    elif t_from is not None:
-        from_account = t_from.find('from_account')
-        if from_account is not None:
-            is_from_account = True  
-            
-    if t_to_my_client is not None:
-        to_account = t_to_my_client.find('to_account')
-        if to_account is not None:
-            is_to_account = True
-       
-    elif t_to is not None:
-        to_account = t_to.find('to_account')
-        if to_account is not None:
-            is_to_account = True
-        
+
+    is_from_account = view.from_party is not None and view.from_party.account is not None
+    is_to_account = view.to_party is not None and view.to_party.account is not None
     return (is_from_account & is_to_account)
 
 # Function to check whether a transaction has accounts in any of From and To sides
-def is_accounts_any_side(transaction):
-    is_from_account = False
-    is_to_account = False
-    
+def is_accounts_any_side(view):
     # Not checking the From and To sides if transaction is multi-party. Simply return true
-    involved_parties = transaction.find('involved_parties')
-    if involved_parties is not None:
+    if view.involved_parties is not None:
         return True
-    
-    t_from_my_client = transaction.find('t_from_my_client')
-    t_from = transaction.find('t_from')
-    t_to_my_client = transaction.find('t_to_my_client')
-    t_to = transaction.find('t_to')
-    
-    if t_from_my_client is not None:
-        from_account = t_from_my_client.find('from_account')
-        if from_account is not None:
-            is_from_account = True
-    
-    elif t_from is not None:
-        from_account = t_from.find('from_account')
-        if from_account is not None:
-            is_from_account = True  
-            
-    if t_to_my_client is not None:
-        to_account = t_to_my_client.find('to_account')
-        if to_account is not None:
-            is_to_account = True
-       
-    elif t_to is not None:
-        to_account = t_to.find('to_account')
-        if to_account is not None:
-            is_to_account = True
-        
+
+    is_from_account = view.from_party is not None and view.from_party.account is not None
+    is_to_account = view.to_party is not None and view.to_party.account is not None
     return (is_from_account | is_to_account)
     
 # Function to check whether a transaction has country LK in both From and To sides
-def is_both_sides_LK(transaction):
-    is_from_LK = False
-    is_to_LK = False
-    
+def is_both_sides_LK(view):
     # Not checking the From and To sides if transaction is multi-party. Simply return true
-    involved_parties = transaction.find('involved_parties')
-    if involved_parties is not None:
+    if view.involved_parties is not None:
         return False
-    
-    t_from_my_client = transaction.find('t_from_my_client')
-    t_from = transaction.find('t_from')
-    t_to_my_client = transaction.find('t_to_my_client')
-    t_to = transaction.find('t_to')
-    
-    if t_from_my_client is not None:
-        from_country_element = t_from_my_client.find('from_country')
-        if from_country_element is not None:
-            from_country = from_country_element.text
-            if from_country == 'LK':
-                is_from_LK = True
-    
-    elif t_from is not None:
-        from_country_element = t_from.find('from_country')
-        if from_country_element is not None:
-            from_country = from_country_element.text
-            if from_country == 'LK':
-                is_from_LK = True
-                    
-    if t_to_my_client is not None:
-        to_country_element = t_to_my_client.find('to_country')
-        if to_country_element is not None:
-            to_country = to_country_element.text
-            if to_country == 'LK':
-                is_to_LK = True
-                    
-    elif t_to is not None:
-        to_country_element = t_to.find('to_country')
-        if to_country_element is not None:
-            to_country = to_country_element.text
-            if to_country == 'LK':
-                is_to_LK = True
-                    
+
+    is_from_LK = view.from_party is not None and view.from_party.country is not None and view.from_party.country.text == 'LK'
+    is_to_LK = view.to_party is not None and view.to_party.country is not None and view.to_party.country.text == 'LK'
     return (is_from_LK & is_to_LK)
 
 
 # Function to validate swift code of an account's Institution with its Institution name
-def is_swift_bank_match(swift_code, institution_name, similarity_threshold=0.75):
-    institution_name_lower = institution_name.lower()
 
-    for key, values in swift_codes_dict.items():
-        if swift_code.upper().startswith(key):
-            for value in values:
-                # Calculate similarity for each institution name associated with the SWIFT code
-                match_ratio = SequenceMatcher(None, institution_name_lower, value.lower()).ratio()
-                if match_ratio > similarity_threshold:
+# Results are cached in the session by the upper case swift code, lower case institution name and threshold (the inputs of the match)
+def is_swift_bank_match(session, swift_code, institution_name, similarity_threshold=0.75):
+    institution_name_lower = institution_name.lower()
+    swift_code_upper = swift_code.upper()
+
+    cache_key = (swift_code_upper, institution_name_lower, similarity_threshold)
+    is_match = session.swift_match_cache.get(cache_key)
+    if is_match is None:
+        is_match = match_swift_bank_name(swift_code_upper, institution_name_lower, similarity_threshold)
+        session.swift_match_cache.put(cache_key, is_match)
+    return is_match
+
+
+# Institution names are looked up by the prefixes of the swift code (one lookup per prefix length in the swift codes
+# file). Before computing the similarity ratio, the cheaper upper bounds of SequenceMatcher (length based real_quick_ratio
+# and character count based quick_ratio, computed from the index) are used to skip names that cannot reach the threshold.
+# The SequenceMatcher is created for each match, as it holds the state of the match (sessions match on several threads)
+def match_swift_bank_name(swift_code_upper, institution_name_lower, similarity_threshold):
+    institution_name_counts = None
+    for prefix_length in swift_prefix_lengths:
+        if len(swift_code_upper) < prefix_length:
+            break
+        for name_lower, name_counts in swift_name_index.get(swift_code_upper[:prefix_length], ()):
+            # Calculate similarity for each institution name associated with the SWIFT code
+            length_total = len(institution_name_lower) + len(name_lower)
+            if not length_total:
+                if 1.0 > similarity_threshold:
                     return True
+                continue
+            if 2.0 * min(len(institution_name_lower), len(name_lower)) / length_total <= similarity_threshold:
+                continue
+            if institution_name_counts is None:
+                institution_name_counts = Counter(institution_name_lower)
+            if 2.0 * sum((institution_name_counts & name_counts).values()) / length_total <= similarity_threshold:
+                continue
+            if SequenceMatcher(None, institution_name_lower, name_lower).ratio() > similarity_threshold:
+                return True
     return False
         
        
@@ -348,7 +1079,7 @@ def is_swift_bank_match(swift_code, institution_name, similarity_threshold=0.75)
 # director person ssn validity check for sri lankans
 # director person passport number presence check for foreigners
 
-def validate_person(person, client_type, transmode):
+def validate_person_details(person, client_type, transmode):
     # Variable to hold and log the name of the last element when an exception is thrown (for troubleshooting general exceptions)
     check_element = ''
     
@@ -528,7 +1259,7 @@ def validate_person(person, client_type, transmode):
 
 # not_my_client entity not validated (other than for name)
 
-def validate_entity(entity, is_my_client):
+def validate_entity_details(session, entity, is_my_client):
     # Variable to hold and log the name of the last element when an exception is thrown (for troubleshooting general exceptions)
     check_element = ''
         
@@ -546,7 +1277,7 @@ def validate_entity(entity, is_my_client):
             legal_form = entity.find('incorporation_legal_form').text
             
             # Incorporation number is mandatory for the selected entity types
-            if legal_form in incorp_number_reg_types:
+            if legal_form in session.settings.incorp_number_reg_types:
                 check_element = 'incorporation_number'
                 incorporation_number_element = entity.find('incorporation_number')
                 if incorporation_number_element is None:
@@ -584,7 +1315,7 @@ def validate_entity(entity, is_my_client):
                 else:
                     for director in directors.findall('t_person'):
                         # Validate each director person
-                        director_valid_result = validate_person(person=director, client_type='director', transmode=None)
+                        director_valid_result = validate_person(session, person=director, client_type='director', transmode=None)
                         if director_valid_result != 'valid':
                             # Extend the error_message list with the returned list
                             error_message.extend(director_valid_result)
@@ -614,9 +1345,10 @@ def validate_entity(entity, is_my_client):
 
 # not_my_client account institution (bank) swift_code check to detect my_client accounts submissions as no_my_clients
 
-def validate_account(report_code, account, is_my_client, rentity_id):
+def validate_account_details(session, report_code, account, is_my_client, rentity_id):
     # Variable to hold and log the name of the last element when an exception is thrown (for general exceptions)
     check_element = ''
+    settings = session.settings
     
     # Array to hold validation error messages for each element in account. 
     # This function goes through all elements and recrod invalid elements 
@@ -632,15 +1364,16 @@ def validate_account(report_code, account, is_my_client, rentity_id):
         # Flag for account number validity check, to ensure only one validation is performed on account number per run
         check_account_number = True
         
-        # Check if account number begins with any invalid prefixes
-        for prefix in invalid_acc_prefixes:
-            if account_number.startswith(prefix):
-                error_message.append(f'flagged prefix: {prefix} in account number') 
-                check_account_number = False
+        # Check if account number begins with any invalid prefixes (each flagged prefix is reported, such as / and //)
+        if settings.invalid_acc_prefix_pattern.match(account_number):
+            for prefix in settings.invalid_acc_prefixes:
+                if account_number.startswith(prefix):
+                    error_message.append(f'flagged prefix: {prefix} in account number') 
+                    check_account_number = False
                 
-        # Check if account number contains any invalid characters
-        if check_account_number:
-            for char in invalid_acc_chars:
+        # Check if account number contains any invalid characters (each flagged character is reported)
+        if check_account_number and settings.invalid_acc_char_pattern.search(account_number):
+            for char in settings.invalid_acc_chars:
                 if char in account_number:
                     error_message.append(f'flagged character: {char} in account number')
                     check_account_number = False
@@ -655,11 +1388,13 @@ def validate_account(report_code, account, is_my_client, rentity_id):
         # If characters are included in the account number, they should be a random sequence rather than words
         # If account number contains English words and very few digits (such as <= 3), it may be invalid
         if check_account_number:
-            numbers = re.findall(r'\d', account_number)
-            if len(numbers) <= 3:
-                # Check if there are English words in account number 
-                words_set = find_english_words(account_number)
-                if words_set: 
+            if account_number.isascii():
+                digit_count = len(account_number) - len(account_number.translate(digit_delete_table))
+            else:
+                digit_count = len(digit_pattern.findall(account_number))
+            if digit_count <= 3:
+                # Check if there are English words in account number (stops at the first word found)
+                if english_word_automaton.contains_word(account_number):
                     error_message.append(f'flagged format: English words with very few digits in account number')
                     check_account_number = False
                 
@@ -669,16 +1404,16 @@ def validate_account(report_code, account, is_my_client, rentity_id):
         # Validations for swift code and institution name (only applicable for local account holding institutions)
         if (report_code != 'IFT'):
             # swift code must match the institutions name at least to the defined threshold
-            if not is_swift_bank_match(swift_code, institution_name, swift_name_match_threshold):
+            if not is_swift_bank_match(session, swift_code, institution_name, settings.swift_name_match_threshold):
                 error_message.append(f'account with institution swift: {swift_code} does not match with institutions name: {institution_name}')
             
             else:
                 if is_my_client:
                     # If my client account institution (bank) SWIFT is not RE's SWIFT, it is an error
-                    if not swift_code.startswith(str(report_entity_swift)):
-                        error_message.append(f'my_client account institution swift: {swift_code} is not same as RE swift: {report_entity_swift}')
+                    if not swift_code.startswith(str(settings.report_entity_swift)):
+                        error_message.append(f'my_client account institution swift: {swift_code} is not same as RE swift: {settings.report_entity_swift}')
                 else:
-                    if swift_code.startswith(str(report_entity_swift)):
+                    if swift_code.startswith(str(settings.report_entity_swift)):
                         # If 'not my client' account swift code equal to RE swift, it could indicate my client account submitted as not my client
                         error_message.append(f'RE account with institution swift: {swift_code} is submitted as not_my_client')
                     else:
@@ -709,7 +1444,7 @@ def validate_account(report_code, account, is_my_client, rentity_id):
             if t_entity is not None:
                 check_element = 't_entity'
                 # Validate entity
-                entity_valid_result = validate_entity(entity=t_entity, is_my_client=True)
+                entity_valid_result = validate_entity(session, entity=t_entity, is_my_client=True)
                 if entity_valid_result != 'valid':
                     # Extend the error_message list with the returned list
                     error_message.extend(entity_valid_result)
@@ -725,7 +1460,7 @@ def validate_account(report_code, account, is_my_client, rentity_id):
                     t_person = signatory.find('t_person')
                     check_element = 'signatories'
                     # Validate each signatory person
-                    person_valid_result = validate_person(person=t_person, client_type='my_client', transmode=None)
+                    person_valid_result = validate_person(session, person=t_person, client_type='my_client', transmode=None)
                     if person_valid_result != 'valid':
                         # Extend the error_message list with the returned list
                         error_message.extend(person_valid_result)
@@ -742,755 +1477,544 @@ def validate_account(report_code, account, is_my_client, rentity_id):
     else:
         return error_message
     
-# Function to validate a transaction
+# Function to get the fingerprint of an XML element and its subtree
 
-# Transaction date validate to check it is before submission date or after report date
-# Mandatory elements presence check for each section of the transaction
-# Validates each transaction for following and stores issues and upload_ids in lists:
-# 1. Checks if transaction date is after report start date (defined in goaml_config.ini) and on or before submission date
-# 2. Checks if location is given for branch transactions and multi-party credit card transactions
-# 3. Checks if amount is above 1 million, below extreme threshold (for CTRs), and not a round number for cash transactions 
-# 4. Checks if both From and To sides are not accounts for cash transactions
-# 5. Checks if any of From and To sides are account for EFT transactions
-# 6. Checks if both From and To sides of IFT transactions are not LK
-# 7. Checks if cash transaction from country is LK (for both my_client and not_my_clients)
-# 8. Validates Persons, Accounts, Entities (my_client and not_my_clients) using relevant functions
-# 9. Checks if amount is not equal to account number 
+# The fingerprint holds the tag, text and number of children of each element of the subtree in document order,
+# which is everything the person, entity and account validators read, and identifies the subtree exactly
+def subtree_fingerprint(element):
+    if element is None:
+        return None
+    return tuple(value for node in element.iter() for value in (node.tag, node.text, len(node)))
+
+
+# Function to run a person, entity or account validator with its results cached by key in the validation cache.
+# If the result is not cached, the known-good store of previous runs (of the session) is checked before running the validator
+
+# Cached results are shared by all callers and must not be modified
+def run_cached_validation(session, cache, key, validator, *args):
+    known_good_store = session.known_good_store
+    validation_result = cache.get(key)
+    if validation_result is None:
+        key_hash = known_good_store.key_hash(key) if known_good_store.enabled else None
+        if key_hash is not None and known_good_store.contains(key_hash):
+            validation_result = 'valid'
+        else:
+            validation_result = validator(*args)
+            if key_hash is not None and validation_result == 'valid':
+                known_good_store.add(key_hash)
+        cache.put(key, validation_result)
+    return validation_result
+
+
+# Functions to validate a person, entity or account, with the results cached in the session by the fingerprint of the
+# element and the other inputs of the validator (the same clients and accounts are found in many transactions)
+
+def validate_person(session, person, client_type, transmode):
+    if session.person_validation_cache.maxsize <= 0 and not session.known_good_store.enabled:
+        return validate_person_details(person, client_type, transmode)
+    key = ('person', client_type, transmode, subtree_fingerprint(person))
+    return run_cached_validation(session, session.person_validation_cache, key, validate_person_details, person, client_type, transmode)
+
+
+def validate_entity(session, entity, is_my_client):
+    if session.entity_validation_cache.maxsize <= 0 and not session.known_good_store.enabled:
+        return validate_entity_details(session, entity, is_my_client)
+    key = ('entity', is_my_client, subtree_fingerprint(entity))
+    return run_cached_validation(session, session.entity_validation_cache, key, validate_entity_details, session, entity, is_my_client)
+
+
+def validate_account(session, report_code, account, is_my_client, rentity_id):
+    if session.account_validation_cache.maxsize <= 0 and not session.known_good_store.enabled:
+        return validate_account_details(session, report_code, account, is_my_client, rentity_id)
+    key = ('account', report_code, is_my_client, rentity_id, subtree_fingerprint(account))
+    return run_cached_validation(session, session.account_validation_cache, key, validate_account_details, session, report_code, account, is_my_client, rentity_id)
+
+
+# Transaction validation rules
+
+# Each check of a transaction is a rule in a registry, which declares the report codes (and for the checks of the
+# From, To and multi-party sides, the directions and client types) it applies to. For each report code the enabled
+# rules that apply are compiled once into a plan, so a transaction only runs the checks of its report code.
+# Rules are enabled or disabled in the [RULES] section of goaml_config.ini.
+# A transaction rule is given the TransactionView of the transaction and returns an issue (category, element, issue)
+# or None. A party rule is also given the PartyView of the side it checks
+
+# View of a transaction shared by the rules, built in one walk over the children of the <transaction> element
+
+# children maps the tag of each child element to the element (the first one, as find() returns). The party of each
+# side of the transaction (party_sides) is resolved once into a PartyView. from_party and to_party are the From and
+# To sides (the my_client side if it is given, otherwise the not my client side). The rules read the settings and
+# caches of the validation session of the view
+class TransactionView:
+    __slots__ = ('transaction', 'children', 'report_code', 'submission_date', 'transaction_number', 'transaction_date',
+                 'transmode_code', 'amount', 'transaction_location', 'transaction_description', 'involved_parties',
+                 'parties', 'from_party', 'to_party', 'session')
+
+    def __init__(self, session, transaction, report_code, submission_date):
+        self.session = session
+        self.transaction = transaction
+        self.report_code = report_code
+        self.submission_date = submission_date
+        children = self.children = {}
+        for child in transaction:
+            if child.tag not in children:
+                children[child.tag] = child
+
+        self.transaction_number = children.get('transactionnumber')
+        self.transaction_date = parse_date(children.get('date_transaction').text)
+        self.transmode_code = children.get('transmode_code').text
+        self.amount = get_numeric_value(children.get('amount_local'))
+        self.transaction_location = children.get('transaction_location')
+        self.transaction_description = children.get('transaction_description')
+        self.involved_parties = children.get('involved_parties')
+
+        # Parties by side label
+        self.parties = {}
+        for side in party_sides:
+            if side.direction == 'multi':
+                party = None
+                if self.involved_parties is not None:
+                    party = next((child for child in self.involved_parties if child.tag == side.tag), None)
+            else:
+                party = children.get(side.tag)
+            if party is not None:
+                self.parties[side.label] = PartyView(side, party)
+
+        self.from_party = self.parties.get('from_my_client') or self.parties.get('from')
+        self.to_party = self.parties.get('to_my_client') or self.parties.get('to')
+
+
+# View of the party element of a side of a transaction, with the person, entity, account and country of the side
+class PartyView:
+    __slots__ = ('side', 'element', 'children', 'person', 'entity', 'account', 'country')
+
+    def __init__(self, side, element):
+        self.side = side
+        self.element = element
+        children = self.children = {}
+        for child in element:
+            if child.tag not in children:
+                children[child.tag] = child
+        self.person = children.get(side.person_tag)
+        self.entity = children.get(side.entity_tag)
+        self.account = children.get(side.account_tag)
+        self.country = children.get(side.country_tag)
+
+
+# Side of a transaction checked by the party rules. The label is the prefix of the element names in the issues, and
+# tag is the tag of the party element (a child of <involved_parties> for the multi-party side)
+class PartySide:
+    __slots__ = ('label', 'direction', 'client_type', 'tag', 'person_tag', 'entity_tag', 'account_tag', 'country_tag')
+
+    def __init__(self, label, direction, client_type, tag, person_tag, entity_tag, account_tag, country_tag):
+        self.label = label
+        self.direction = direction
+        self.client_type = client_type
+        self.tag = tag
+        self.person_tag = person_tag
+        self.entity_tag = entity_tag
+        self.account_tag = account_tag
+        self.country_tag = country_tag
+
+
+# Sides of a transaction, in the order their issues are reported
+party_sides = [
+    PartySide('from_my_client', 'from', 'my_client', 't_from_my_client', 'from_person', 'from_entity', 'from_account', 'from_country'),
+    PartySide('from', 'from', 'not_my_client', 't_from', 'from_person', 'from_entity', 'from_account', 'from_country'),
+    PartySide('to_my_client', 'to', 'my_client', 't_to_my_client', 'to_person', 'to_entity', 'to_account', 'to_country'),
+    PartySide('to', 'to', 'not_my_client', 't_to', 'to_person', 'to_entity', 'to_account', 'to_country'),
+    PartySide('multi', 'multi', 'my_client', 'party', 'person_my_client', 'entity_my_client', 'account_my_client', None),
+]
+
+
+# Validation rule of the registry. report_codes, directions and client_types are None if the rule applies to all.
+# default_setting is the name of the validation setting that enables the rule by default (if it is not always enabled)
+class ValidationRule:
+    __slots__ = ('name', 'check', 'report_codes', 'directions', 'client_types', 'default_setting')
+
+    def __init__(self, name, check, report_codes=None, directions=None, client_types=None, default_setting=None):
+        self.name = name
+        self.check = check
+        self.report_codes = report_codes
+        self.directions = directions
+        self.client_types = client_types
+        self.default_setting = default_setting
+
+    def is_enabled_by_default(self, settings):
+        return self.default_setting is None or getattr(settings, self.default_setting)
+
+    def is_enabled(self, settings):
+        return settings.config.getboolean('RULES', self.name, fallback=self.is_enabled_by_default(settings))
+
+    def applies_to(self, report_code, side=None):
+        if self.report_codes is not None and report_code not in self.report_codes:
+            return False
+        if side is not None and self.directions is not None and side.direction not in self.directions:
+            return False
+        if side is not None and self.client_types is not None and side.client_type not in self.client_types:
+            return False
+        return True
+
+
+# Checks if transaction date is after report start date and on or before submission date
+def check_transaction_date(view):
+    if not is_valid_transaction_date(view.transaction_date, view.submission_date, view.session.settings.report_start_day):
+        return 'invalid_transaction_date', 'date_transaction', f'transaction date: {view.transaction_date} invalid for submission date: {view.submission_date}'
+
+
+# Checks for late submissions (CheckLateSubmissions in goaml_config.ini)
+def check_late_submission(view):
+    if is_late_submission(view.transaction_date, view.submission_date, view.session.settings.reporting_window):
+        return 'late_submission', 'date_transaction', f'transaction date: {view.transaction_date} is a late submission for submission date: {view.submission_date}'
 
-def process_transaction(transaction_seq, transaction, report_code, upload_id, submission_date):
-    # Variable to indicate if the transaction is valid
-    is_txn_valid = True
-    
-    transaction_number = transaction.find('transactionnumber')
-    transaction_location = transaction.find('transaction_location')
-    transaction_description = transaction.find('transaction_description')
-    transaction_date_text = transaction.find('date_transaction').text
-    transaction_date = parse_date(transaction_date_text)
-    transmode_code = transaction.find('transmode_code').text
-    transaction_amount_local = transaction.find('amount_local')
-    involved_parties = transaction.find('involved_parties')
-    CDS_details = transaction.find('transaction_description')
-
-    # Validate transaction date
-    if not is_valid_transaction_date(transaction_date, submission_date):
-        reporting_issues.append({
-            'report_name': f'{report_code}: {upload_id}',
-            'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-            'category': 'invalid_transaction_date',
-            'element': 'date_transaction',
-            'issue': f'transaction date: {transaction_date} invalid for submission date: {submission_date}',
-            'CDS details': f'{CDS_details}'
-            
-        })
-        
-        # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-        issues_upload_ids.append(upload_id)
-        # Set the transaction as invalid
-        is_txn_valid = False
-        
-    # Check for late submissions
-    if check_late_submissions:
-        if is_late_submission(transaction_date, submission_date):
-            reporting_issues.append({
-            'report_name': f'{report_code}: {upload_id}',
-            'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-            'category': 'late_submission',
-            'element': 'date_transaction',
-            'issue': f'transaction date: {transaction_date} is a late submission for submission date: {submission_date}',
-            'CDS details': f'{CDS_details.text}'
-            })
-        
-            # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-            issues_upload_ids.append(upload_id)
-            # Set the transaction as invalid
-            is_txn_valid = False    
 
-    # Determine if transaction_location is mandatory
+# Checks if location is given for branch transactions and multi-party credit card transactions
+def check_transaction_location(view):
     location_mandatory = False
     credit_card_desc = False
-    
+
     # If transmode code is 'BRCH'
-    if transmode_code == 'BRCH':
+    if view.transmode_code == 'BRCH':
         location_mandatory = True
     # If multi-party and credit card transaction, merchant address should be given in location
-    elif involved_parties is not None and transaction_description is not None and transaction_description.text is not None and 'credit card' in transaction_description.text.lower():
+    elif view.involved_parties is not None and view.transaction_description is not None and view.transaction_description.text is not None and 'credit card' in view.transaction_description.text.lower():
         location_mandatory = True
         credit_card_desc = True
 
     # Check transaction location validity based on the mandatory flag
-    if location_mandatory and not is_valid(transaction_location.text if transaction_location is not None else None):
-        reporting_issues.append({
-            'report_name': f'{report_code}: {upload_id}',
-            'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-            'category': 'mandatory but missing/invalid transaction location',
-            'element': 'transaction_location',
-            'issue': f'transaction location not given for: {transmode_code} and multiparty credit card transaction: {credit_card_desc}',
-            'CDS details': f'{CDS_details.text}'
-        })
-        
-        # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-        issues_upload_ids.append(upload_id)
-        # Set the transaction as invalid
-        is_txn_valid = False
-
-    amount = get_numeric_value(transaction_amount_local)
-    
-    # Validations for amount
-    if amount is not None:
-        # Check if amount is below 1 million
-        if amount < 1000000:
-            reporting_issues.append({
-            'report_name': f'{report_code}: {upload_id}',
-            'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-            'category': 'amount_below_1_million',
-            'element': 'amount_local',
-            'issue': f'amount {amount} below LKR 1 Mn',
-            'CDS details': f'{CDS_details.text}'
-            })
-        
-            # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-            issues_upload_ids.append(upload_id)
-            # Set the transaction as invalid
-            is_txn_valid = False
-            
-        if (report_code == 'CTR'):
-            # Check if amount is above extreme valule threshold for cash transactions
-            if (amount > ctr_threshold):
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'cash_amount_above_extreme_threshold',
-                'element': 'amount_local',
-                'issue': f'CTR amount {amount} extreme value (EFT may be submitted as CTR)',
-                'CDS details': f'{CDS_details.text}'
-                })
+    if location_mandatory and not is_valid(view.transaction_location.text if view.transaction_location is not None else None):
+        return 'mandatory but missing/invalid transaction location', 'transaction_location', f'transaction location not given for: {view.transmode_code} and multiparty credit card transaction: {credit_card_desc}'
 
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
-        
-            # Check if cash transaction amount is not a round amount (not multiples of 5 (change this to 10, 20, 100, etc. if necessary))
-            if not (amount % 5 == 0):
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'cash_amount_not_round_value',
-                'element': 'amount_local',
-                'issue': f'CTR amount: {amount} not round amount (may be EFT?)',
-                'CDS details': f'{CDS_details.text}'
-                })
 
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
-    
-    # Check if both sides of a cash transaction are accounts
-    if report_code == 'CTR':
-        if is_accounts_both_side(transaction):
-            reporting_issues.append({
-            'report_name': f'{report_code}: {upload_id}',
-            'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-            'category': 'cash_transaction_both_From_and_To_sides_are_accounts',
-            'element': 'transaction',
-            'issue': 'cash transaction both From and To sides are accounts',
-            'CDS details': f'{CDS_details.text}'
-            })
-            
-            # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-            issues_upload_ids.append(upload_id)
-            # Set the transaction as invalid
-            is_txn_valid = False
+# Checks if amount is below 1 million
+def check_amount_below_1_million(view):
+    if view.amount is not None and view.amount < 1000000:
+        return 'amount_below_1_million', 'amount_local', f'amount {view.amount} below LKR 1 Mn'
+
+
+# Checks if amount is above extreme valule threshold for cash transactions
+def check_cash_amount_threshold(view):
+    if view.amount is not None and view.amount > view.session.settings.ctr_threshold:
+        return 'cash_amount_above_extreme_threshold', 'amount_local', f'CTR amount {view.amount} extreme value (EFT may be submitted as CTR)'
+
+
+# Checks if cash transaction amount is not a round amount (not multiples of 5 (change this to 10, 20, 100, etc. if necessary))
+def check_cash_amount_round(view):
+    if view.amount is not None and not (view.amount % 5 == 0):
+        return 'cash_amount_not_round_value', 'amount_local', f'CTR amount: {view.amount} not round amount (may be EFT?)'
+
+
+# Checks if both sides of a cash transaction are accounts
+def check_cash_accounts_both_sides(view):
+    if is_accounts_both_side(view):
+        return 'cash_transaction_both_From_and_To_sides_are_accounts', 'transaction', 'cash transaction both From and To sides are accounts'
+
+
+# Checks if any side of a EFT transaction is account
+def check_eft_accounts_any_side(view):
+    if not is_accounts_any_side(view):
+        return 'EFT_transaction_any_of_From_and_To_side_is_not_account', 'transaction', 'EFT transaction any of From and To side is not account'
+
+
+# Checks if both side of an IFT transaction country is 'LK'
+def check_ift_both_sides_lk(view):
+    if is_both_sides_LK(view):
+        return 'IFT_transaction_both_From_and_To_side_countries_are_LK', 'transaction', 'IFT transaction both From and To side countries are LK'
+
+
+# Checks if cash transaction From or To country is LK (for both my_client and not_my_clients)
+def check_cash_party_country(view, party):
+    if party.country.text != 'LK':
+        direction = 'From' if party.side.direction == 'from' else 'To'
+        return f'cash_transaction_{direction}_country_not_LK', f'{party.side.label}_country', f'cash transaction {direction} country: {party.country.text} not LK'
+
+
+# Validates the person of a side
+def check_party_person(view, party):
+    person = party.person
+    if person is not None:
+        validation_result = validate_person(view.session, person=person, client_type=party.side.client_type, transmode=view.transmode_code)
+        if validation_result != 'valid':
+            return 'invalid_person_details', f'{party.side.label}_person', validation_result
+
+
+# Validates the entity of a side
+def check_party_entity(view, party):
+    entity = party.entity
+    if entity is not None:
+        validation_result = validate_entity(view.session, entity=entity, is_my_client=party.side.client_type == 'my_client')
+        if validation_result != 'valid':
+            return 'invalid_entity_details', f'{party.side.label}_entity', validation_result
+
+
+# Validates the account of a side
+def check_party_account(view, party):
+    account = party.account
+    if account is not None:
+        validation_result = validate_account(view.session, view.report_code, account=account, is_my_client=party.side.client_type == 'my_client', rentity_id=view.session.settings.report_entity_id)
+        if validation_result != 'valid':
+            return 'invalid_account_details', f'{party.side.label}_account', validation_result
+
+
+# Checks if account number of a side is equal to the amount
+def check_party_account_amount(view, party):
+    account = party.account
+    if account is not None:
+        account_number = get_numeric_value(account.find('account'))
+        if account_number is not None and account_number == view.amount:
+            return 'amount_equal_to_account_number', f'{party.side.label}_account', f'amount: {view.amount} equal to account number'
+
+
+# Rules of a transaction, in the order their issues are reported
+transaction_rules = [
+    ValidationRule('TransactionDate', check_transaction_date),
+    ValidationRule('LateSubmission', check_late_submission, default_setting='check_late_submissions'),
+    ValidationRule('TransactionLocation', check_transaction_location),
+    ValidationRule('AmountBelow1Million', check_amount_below_1_million),
+    ValidationRule('CashAmountAboveThreshold', check_cash_amount_threshold, report_codes=('CTR',)),
+    ValidationRule('CashAmountNotRound', check_cash_amount_round, report_codes=('CTR',)),
+    ValidationRule('CashAccountsBothSides', check_cash_accounts_both_sides, report_codes=('CTR',)),
+    ValidationRule('EFTNoAccountSide', check_eft_accounts_any_side, report_codes=('EFT',)),
+    ValidationRule('IFTBothSidesLK', check_ift_both_sides_lk, report_codes=('IFT',)),
+]
+
+# Rules of each side of a transaction (party_sides), in the order their issues are reported
+party_rules = [
+    ValidationRule('CashCountryNotLK', check_cash_party_country, report_codes=('CTR',), directions=('from', 'to')),
+    ValidationRule('PersonDetails', check_party_person),
+    ValidationRule('EntityDetails', check_party_entity),
+    ValidationRule('AccountDetails', check_party_account),
+    ValidationRule('AmountEqualToAccountNumber', check_party_account_amount),
+]
+
+# Function to get the rule plan of a report code, compiled on first use (by session): the transaction rules and the party
+# rules of each side that apply to the report code and are enabled (sides without rules are not looked up at all)
+def get_rule_plan(session, report_code):
+    plan = session.rule_plans.get(report_code)
+    if plan is None:
+        settings = session.settings
+        enabled_transaction_rules = tuple(rule for rule in transaction_rules if rule.is_enabled(settings) and rule.applies_to(report_code))
+        enabled_party_rules = [rule for rule in party_rules if rule.is_enabled(settings)]
+        side_plans = []
+        for side in party_sides:
+            side_rules = tuple(rule for rule in enabled_party_rules if rule.applies_to(report_code, side))
+            if side_rules:
+                side_plans.append((side, side_rules))
+        plan = session.rule_plans[report_code] = (enabled_transaction_rules, tuple(side_plans))
+    return plan
+
+
+# Function to get the names of the rules switched off in goaml_config.ini
+def get_disabled_rules(settings):
+    return [rule.name for rule in transaction_rules + party_rules if rule.is_enabled_by_default(settings) and not rule.is_enabled(settings)]
+
 
-    # Check if any side of a EFT transaction is account
-    if report_code == 'EFT':
-        if not is_accounts_any_side(transaction):
-            reporting_issues.append({
-            'report_name': f'{report_code}: {upload_id}',
-            'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-            'category': 'EFT_transaction_any_of_From_and_To_side_is_not_account',
-            'element': 'transaction',
-            'issue': 'EFT transaction any of From and To side is not account',
-            'CDS details': f'{CDS_details.text}'
-            })
-            
-            # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-            issues_upload_ids.append(upload_id)
-            # Set the transaction as invalid
-            is_txn_valid = False
-
-    # Check if both side of an IFT transaction country is 'LK'
-    if report_code == 'IFT':
-        if is_both_sides_LK(transaction):
-            reporting_issues.append({
-            'report_name': f'{report_code}: {upload_id}',
-            'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-            'category': 'IFT_transaction_both_From_and_To_side_countries_are_LK',
-            'element': 'transaction',
-            'issue': 'IFT transaction both From and To side countries are LK',
-            'CDS details': f'{CDS_details.text}'
-            }) 
-            
-            # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-            issues_upload_ids.append(upload_id)
-            # Set the transaction as invalid
-            is_txn_valid = False
-
-
-    # ****************************** FROM SIDE ***************************************
-    # ********************************************************************************
-
-    # <from_my_client> ----------------------------------------
-    from_my_client = transaction.find('t_from_my_client')
-    if from_my_client is not None:
-        from_funds_code = from_my_client.find('from_funds_code')
-        from_country = from_my_client.find('from_country')
-        
-        # Invalid if CTR report has from country not LK
-        if (report_code == 'CTR') & (from_country.text != 'LK'):
-            reporting_issues.append({
-            'report_name': f'{report_code}: {upload_id}',
-            'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-            'category': 'cash_transaction_From_country_not_LK',
-            'element': 'from_my_client_country',
-            'issue': f'cash transaction From country: {from_country.text} not LK',
-            'CDS details': f'{CDS_details.text}'
-            })
-            
-            # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-            issues_upload_ids.append(upload_id)
-            # Set the transaction as invalid
-            is_txn_valid = False
-
-        # 1. <from my client Persons>
-        from_person = from_my_client.find('from_person')
-        if from_person is not None:
-            # Validate person
-            validation_result = validate_person(person=from_person, client_type='my_client', transmode=transmode_code)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_person_details',
-                'element': 'from_my_client_person',
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
-
-        # 2. <from my client Entities>
-        from_entity = from_my_client.find('from_entity')
-        if from_entity is not None:
-            # Vlidate entity
-            validation_result = validate_entity(entity=from_entity, is_my_client=True)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_entity_details',
-                'element': 'from_my_client_entity',
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
-
-        # 3. <from my client Accounts>
-        from_account = from_my_client.find('from_account')
-        if from_account is not None:
-            # Validate account
-            validation_result = validate_account(report_code, account=from_account, is_my_client=True, rentity_id=report_entity_id)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_account_details',
-                'element': 'from_my_client_account',
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
+# Function to validate a transaction
 
-            # Check if account number is equal to the amount
-            account = from_account.find('account')
-            account_number = get_numeric_value(account)
-            if account_number is not None and account_number == amount:
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'amount_equal_to_account_number',
-                'element': 'from_my_client_account',
-                'issue': f'amount: {amount} equal to account number',
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
+# Runs the rules of the rule plan of the report code on the transaction, and stores their issues and the upload_id
+# of the report in the session:
+# 1. Checks if transaction date is after report start date (defined in goaml_config.ini) and on or before submission date
+# 2. Checks if location is given for branch transactions and multi-party credit card transactions
+# 3. Checks if amount is above 1 million, below extreme threshold (for CTRs), and not a round number for cash transactions 
+# 4. Checks if both From and To sides are not accounts for cash transactions
+# 5. Checks if any of From and To sides are account for EFT transactions
+# 6. Checks if both From and To sides of IFT transactions are not LK
+# 7. Checks if cash transaction from country is LK (for both my_client and not_my_clients)
+# 8. Validates Persons, Accounts, Entities (my_client and not_my_clients) using relevant functions
+# 9. Checks if amount is not equal to account number 
 
-    # <from not my client> ----------------------------------------
-    from_client = transaction.find('t_from')
-    if from_client is not None:
-        from_funds_code = from_client.find('from_funds_code')
-        from_country = from_client.find('from_country')
-        # Invalid if CTR report has from country not LK
-        if (report_code == 'CTR') & (from_country.text != 'LK'):
-            reporting_issues.append({
-            'report_name': f'{report_code}: {upload_id}',
-            'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-            'category': 'cash_transaction_From_country_not_LK',
-            'element': 'from_country',
-            'issue': f'cash transaction From country: {from_country.text} not LK',
-            'CDS details': f'{CDS_details.text}'
-            })
-            
-            # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-            issues_upload_ids.append(upload_id)
-            # Set the transaction as invalid
-            is_txn_valid = False
+def process_transaction(session, transaction_seq, transaction, report_code, upload_id, submission_date):
+    # Variable to indicate if the transaction is valid
+    is_txn_valid = True
+    reporting_issues = session.reporting_issues
+    issues_upload_ids = session.issues_upload_ids
 
-        # 1. <from not my client persons>
-        from_person = from_client.find('from_person')
-        if from_person is not None:
-            # Validate person
-            validation_result = validate_person(person=from_person, client_type='not_my_client', transmode=transmode_code)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_person_details',
-                'element': 'from_person',    
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
+    # Child elements and parties of the transaction, shared by the rules
+    view = TransactionView(session, transaction, report_code, submission_date)
+    transaction_number = view.transaction_number
+    CDS_details = view.transaction_description
 
-        # 2. <from not my client Entities>
-        from_entity = from_client.find('from_entity')
-        if from_entity is not None:
-            # Validate entity
-            validation_result = validate_entity(entity=from_entity, is_my_client=False)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_entity_details',
-                'element': 'from_entity',
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
+    # Report name, transaction number and CDS details shared by all issues of the transaction
+    issue_context = TransactionContext(sys.intern(f'{report_code}: {upload_id}'),
+                                       transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
+                                       f'{CDS_details.text if CDS_details is not None else None}')
 
-        # 3. <from not my client Accounts>
-        from_account = from_client.find('from_account')
-        if from_account is not None:
-            # Validate account
-            validation_result = validate_account(report_code, account=from_account, is_my_client=False, rentity_id=report_entity_id)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_account_details',
-                'element': 'from_account',
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
-                
-            # Check if account number is equal to the amount
-            account = from_account.find('account')
-            account_number = get_numeric_value(account)
-            if account_number is not None and account_number == amount:
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'amount_equal_to_account_number',
-                'element': 'from_account',
-                'issue': f'amount: {amount} equal to account number',
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
+    transaction_plan, side_plans = get_rule_plan(session, report_code)
 
-    # ------------------------------------------------------------------
-
-
-    # ****************************** TO SIDE ***************************************
-    # ********************************************************************************
-
-    # <to_my_client> ----------------------------------------
-    to_my_client = transaction.find('t_to_my_client')
-    if to_my_client is not None:
-        to_funds_code = to_my_client.find('to_funds_code')
-        to_country = to_my_client.find('to_country')
-        # Invalid if CTR report has To Country not LK
-        if (report_code == 'CTR') & (to_country.text != 'LK'):
-            reporting_issues.append({
-            'report_name': f'{report_code}: {upload_id}',
-            'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-            'category': 'cash_transaction_To_country_not_LK',
-            'element': 'to_my_client_country',
-            'issue': f'cash transaction To country: {to_country.text} not LK',
-            'CDS details': f'{CDS_details.text}'
-            })
-            
+    for rule in transaction_plan:
+        issue = rule.check(view)
+        if issue is not None:
+            reporting_issues.append(Issue(issue_context, *issue))
             # Append upload id of the invalid report to a list for later usage (downloading XML reports)
             issues_upload_ids.append(upload_id)
             # Set the transaction as invalid
             is_txn_valid = False
 
-        # 1. <to my client persons>
-        to_person = to_my_client.find('to_person')
-        if to_person is not None:
-            # Validate person
-            validation_result = validate_person(person=to_person, client_type='my_client', transmode=transmode_code)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_person_details',
-                'element': 'to_my_client_person',
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
+    for side, side_rules in side_plans:
+        party = view.parties.get(side.label)
+        if party is None:
+            continue
+        for rule in side_rules:
+            issue = rule.check(view, party)
+            if issue is not None:
+                reporting_issues.append(Issue(issue_context, *issue))
                 # Append upload id of the invalid report to a list for later usage (downloading XML reports)
                 issues_upload_ids.append(upload_id)
                 # Set the transaction as invalid
                 is_txn_valid = False
 
-        # 2. <to my client Entities>
-        to_entity = to_my_client.find('to_entity')
-        if to_entity is not None:
-            # Validate entity
-            validation_result = validate_entity(entity=to_entity, is_my_client=True)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_entity_details',
-                'element': 'to_my_client_entity',
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
-
-        # 3. <to my client Accounts>
-        to_account = to_my_client.find('to_account')
-        if to_account is not None:
-            # Validate account
-            validation_result = validate_account(report_code, account=to_account, is_my_client=True, rentity_id=report_entity_id)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_account_details',
-                'element': 'to_my_client_account',
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
-                
-            # Check if account number is equal to the amount
-            account = to_account.find('account')
-            account_number = get_numeric_value(account)
-            if account_number is not None and account_number == amount:
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'amount_equal_to_account_number',
-                'element': 'to_my_client_account',
-                'issue': f'amount: {amount} equal to account number',
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
-    # ------------------------------------------------------------------
-
-    # <to_not_my_client> ----------------------------------------
-    to_client = transaction.find('t_to')
-    if to_client is not None:
-        to_funds_code = to_client.find('to_funds_code')
-        to_country = to_client.find('to_country')
-        # Invalid if CTR report has to country not LK
-        if (report_code == 'CTR') & (to_country.text != 'LK'):
-            reporting_issues.append({
-            'report_name': f'{report_code}: {upload_id}',
-            'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-            'category': 'cash_transaction_To_country_not_LK',
-            'element': 'to_country',
-            'issue': f'cash transaction To country: {to_country.text} not LK',
-            'CDS details': f'{CDS_details.text}'
-            })
-            
-            # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-            issues_upload_ids.append(upload_id)
-            # Set the transaction as invalid
-            is_txn_valid = False
-
-        # 1. <to not my client persons>
-        to_person = to_client.find('to_person')
-        if to_person is not None:
-            # Validate person
-            validation_result = validate_person(person=to_person, client_type='not_my_client', transmode=transmode_code)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_person_details',
-                'element': 'to_person',
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
+    return is_txn_valid
+# Function to stream the elements of an XML report that are validated (report_code, submission_date and transaction)
+
+# Elements are yielded when they are closed, and cleared after the caller has processed them. In streaming mode
+# (StreamingParse in goaml_config.ini) each processed <transaction> is also detached from the report root, so the
+# parsed tree never grows beyond the report header and the transaction being validated.
+# The report is parsed with lxml if it is installed and selected (ParserEngine in goaml_config.ini), otherwise with
+# xml.etree.ElementTree. The peak number of elements held in the parsed tree is recorded in parse_stats
+
+def iter_report_elements(xml_stream, parse_stats, settings):
+    if settings.use_lxml:
+        return iter_report_elements_lxml(xml_stream, parse_stats, settings.streaming_parse)
+    return iter_report_elements_etree(xml_stream, parse_stats, settings.streaming_parse)
+
+
+# ElementTree elements have no link to their parent, so the streaming mode needs the 'start' event of the root element.
+# XMLPullParser cannot change its events once created, so the 'start' events after the one of the root are skipped
+def iter_report_elements_etree(xml_stream, parse_stats, streaming_parse):
+    root = None
+    live_elements = 0
+    parser = ET.XMLPullParser(events=('start', 'end') if streaming_parse else ('end',))
+
+    for event, elem in iter_parse_events(parser, xml_stream):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+
+        live_elements += 1
+        if elem.tag not in report_element_tags:
+            continue
+
+        yield elem
+
+        if elem.tag == 'transaction':
+            parse_stats['peak_elements'] = max(parse_stats['peak_elements'], live_elements)
+            # Clear the processed element to free memory (only the cleared <transaction> element is left in the tree)
+            live_elements -= sum(1 for _ in elem.iter()) - 1
+            elem.clear()
+            # Detach the processed transaction from the root (transactions are direct children of <report>).
+            # Earlier transactions are already detached, so it is found right after the report header elements
+            if root is not None:
+                try:
+                    root.remove(elem)
+                    live_elements -= 1
+                except ValueError:
+                    pass
+        else:
+            elem.clear()  # Clear the processed element to free memory
+
+    parse_stats['peak_elements'] = max(parse_stats['peak_elements'], live_elements)
+    # Clear the root element to free up memory
+    if root is not None:
+        root.clear()
+
+
+# Function to read the events of an XML file with a pull parser, fed in chunks of report_parse_chunk_size
+def iter_parse_events(parser, xml_stream):
+    while True:
+        data = xml_stream.read(report_parse_chunk_size)
+        # The end of the stream is an empty read (b'' of a binary stream, '' of a text stream)
+        if not data:
+            break
+        parser.feed(data)
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+# lxml filters the events by tag in C, so only the 'end' events of the validated elements reach Python code,
+# and elements know their parent, so no 'start' events are needed to detach processed transactions
+def iter_report_elements_lxml(xml_stream, parse_stats, streaming_parse):
+    from lxml import etree as lxml_etree
+
+    root = None
+    live_elements = 0
+
+    for event, elem in lxml_etree.iterparse(xml_stream, events=('end',), tag=report_element_tags):
+        if elem.tag == 'transaction':
+            parse_stats['peak_elements'] = max(parse_stats['peak_elements'], live_elements + sum(1 for _ in elem.iter()))
+        live_elements += 1
+
+        yield elem
+
+        # Clear the processed element to free memory
+        elem.clear(keep_tail=True)
+        parent = elem.getparent()
+        if parent is not None:
+            root = parent
+            # Detach the processed transaction from its parent
+            if streaming_parse and elem.tag == 'transaction':
+                parent.remove(elem)
+                live_elements -= 1
+
+    parse_stats['peak_elements'] = max(parse_stats['peak_elements'], live_elements)
+    # Clear the root element to free up memory
+    if root is not None:
+        root.clear()
 
-        # 2. <to not my client Entities>
-        to_entity = to_client.find('to_entity')
-        if to_entity is not None:
-            # Validate entity
-            validation_result = validate_entity(entity=to_entity, is_my_client=False)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_entity_details',
-                'element': 'to_entity',
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
 
-        # 3. <to not my client Accounts>
-        to_account = to_client.find('to_account')
-        if to_account is not None:
-            # Validate account
-            validation_result = validate_account(report_code, account=to_account, is_my_client=False, rentity_id=report_entity_id)
-            if validation_result != 'valid':
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'invalid_account_details',
-                'element': 'to_account',
-                'issue': validation_result,
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
-                
-            # Check if account number is equal to the amount
-            account = to_account.find('account')
-            account_number = get_numeric_value(account)
-            if account_number is not None and account_number == amount:
-                reporting_issues.append({
-                'report_name': f'{report_code}: {upload_id}',
-                'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                'category': 'amount_equal_to_account_number',
-                'element': 'to_account',
-                'issue': f'amount: {amount} equal to account number',
-                'CDS details': f'{CDS_details.text}'
-                 })
-                
-                # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                issues_upload_ids.append(upload_id)
-                # Set the transaction as invalid
-                is_txn_valid = False
-    # ------------------------------------------------------------------
-
-
-    # ****************************** MULTI PARTY ***************************************
-    # ********************************************************************************
-
-    # <involved_parties> ----------------------------------------
-    involved_parties = transaction.find('involved_parties')
-    if involved_parties is not None:
-        party = involved_parties.find('party')
-        if party is not None:
-            party_role = party.find('role').text
-            party_funds_code = party.find('funds_code').text
-            party_country = party.find('country').text
-
-            # 1. <multi party Persons>
-            multi_person = party.find('person_my_client')
-            if multi_person is not None:
-                # Validate person
-                validation_result = validate_person(person=multi_person, client_type='my_client', transmode=transmode_code)
-                if validation_result != 'valid':
-                    reporting_issues.append({
-                    'report_name': f'{report_code}: {upload_id}',
-                    'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                    'category': 'invalid_person_details',
-                    'element': 'multi_person',
-                    'issue': validation_result,
-                    'CDS details': f'{CDS_details.text}'
-                     })
-                    
-                    # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                    issues_upload_ids.append(upload_id)
-                    # Set the transaction as invalid
-                    is_txn_valid = False
-
-            # 2. <multi party Entities>
-            multi_entity = party.find('entity_my_client')
-            if multi_entity is not None:
-                # Validate entity
-                validation_result = validate_entity(entity=multi_entity, is_my_client=True)
-                if validation_result != 'valid':
-                    reporting_issues.append({
-                    'report_name': f'{report_code}: {upload_id}',
-                    'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                    'category': 'invalid_entity_details',
-                    'element': 'multi_entity',
-                    'issue': validation_result,
-                    'CDS details': f'{CDS_details.text}'
-                     })
-                    
-                    # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                    issues_upload_ids.append(upload_id)
-                    # Set the transaction as invalid
-                    is_txn_valid = False
-
-            # 3. <multi party Accounts>
-            multi_account = party.find('account_my_client')
-            if multi_account is not None:
-                # Validate account
-                validation_result = validate_account(report_code, account=multi_account, is_my_client=True, rentity_id=report_entity_id)
-                if validation_result != 'valid':
-                    reporting_issues.append({
-                    'report_name': f'{report_code}: {upload_id}',
-                    'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                    'category': 'invalid_account_details',
-                    'element': 'multi_account',
-                    'issue': validation_result,
-                    'CDS details': f'{CDS_details.text}'
-                     }) 
-                    
-                    # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                    issues_upload_ids.append(upload_id)
-                    # Set the transaction as invalid
-                    is_txn_valid = False
-                    
-                # Check if account number is equal to the amount
-                account = multi_account.find('account')
-                account_number = get_numeric_value(account)
-                if account_number is not None and account_number == amount:
-                    reporting_issues.append({
-                    'report_name': f'{report_code}: {upload_id}',
-                    'transaction_number': transaction_number.text if transaction_number is not None else f'<transaction> {transaction_seq}',
-                    'category': 'amount_equal_to_account_number',
-                    'element': 'multi_account',
-                    'issue': f'amount: {amount} equal to account number',
-                    'CDS details': f'{CDS_details.text}'
-                     })
-
-                    # Append upload id of the invalid report to a list for later usage (downloading XML reports)
-                    issues_upload_ids.append(upload_id)
-                    # Set the transaction as invalid
-                    is_txn_valid = False
-    # ------------------------------------------------------------------
-    
-    return is_txn_valid
 # Function to validate XML report 
 
 # Uses iterparse to process XML content in a memroy-friendly way, clearing each element after processing 
+# The report is given as a file path or a binary file object. It is read in chunks by the parser (never loaded to
+# memory as a whole), and decoded using the encoding given in the XML declaration (UTF-8 if not given).
+# Issues and errors are stored in the session (the session of the config file if none is given)
 
-def process_report(xml_content, upload_id):
-    global details
+def process_report(xml_source, upload_id, session=None):
+    if session is None:
+        session = get_default_session()
     try:
+        # Load the reference data used by the validators (only done for the first report)
+        load_reference_data(session.settings.reference_data_cache_file)
+
         # Variable to count invalid transactions
         invalid_txn_count = 0
-        
-        # Convert the XML string to a file-like object for iterparse (faster processing and memory efficient)
-        xml_file_like_object = io.StringIO(xml_content)
-
-        # Assume reporting_issues is accessible and defined elsewhere
-        global reporting_issues
 
         # Defining these variables here so they are visible to 'transaction' <<if block>>
         report_code = ''
         submission_date_text = ''
         submission_date = ''
         transaction_seq = 0
+        parse_stats = {'peak_elements': 0}
 
-        # Loop through the XML content as stream
-        for event, elem in ET.iterparse(xml_file_like_object, events=('start', 'end')):
-            if event == 'start':
-                # Handle start of xml elements in stream if needed (e.g., initializing something)
-                pass
+        # Open the report in binary mode if a path is given. A file object is used as it is (and not closed here)
+        if isinstance(xml_source, (str, bytes, os.PathLike)):
+            xml_file = open(xml_source, 'rb')
+        else:
+            xml_file = nullcontext(xml_source)
 
-            if event == 'end':
-                # Process xml elements as they are closed, reducing memory usage
+        with xml_file as xml_stream:
+            # Loop through the report_code, submission_date and transaction elements of the XML content as stream
+            for elem in iter_report_elements(xml_stream, parse_stats, session.settings):
                 if elem.tag == 'report_code':
                     report_code = elem.text if elem.text is not None else None
-                    elem.clear()  # Clear the processed element to free memory
-                    if report_code not in report_types:
+                    if report_code not in session.settings.report_types:
                         return False, 0
 
                 if elem.tag == 'submission_date':
                     submission_date_text = elem.text if elem.text is not None else None
                     submission_date = parse_date(submission_date_text)
-                    elem.clear()  # Clear the processed element to free memory
 
                 if elem.tag == 'transaction':
                     # Process each <transaction> element
                     transaction_seq += 1
-                    txn_valid =  process_transaction(transaction_seq, elem, report_code, upload_id, submission_date)
+                    txn_valid =  process_transaction(session, transaction_seq, elem, report_code, upload_id, submission_date)
                     # If transaction is not valid after validation, increment the counter
                     if not txn_valid:
                         invalid_txn_count += 1
-                    elem.clear()  # Clear the processed element to free memory
 
-        # Clear the root element to free up memory
-        elem.clear()
+        # Record the number of elements held in memory at the peak of parsing the report
+        session.report_parse_stats.append({'report_id': upload_id, 'transactions': transaction_seq, 'peak_elements': parse_stats['peak_elements']})
         return True, invalid_txn_count
     
     except Exception as e:
@@ -1503,229 +2027,1022 @@ def process_report(xml_content, upload_id):
         
         # Capture the current traceback, format it to a string, and then print it
         traceback_details = traceback.format_exc()
-        details += f'Error in processing report id: {upload_id} Error: {str(e)}]\nOn line {lineno}: {line.strip()}\n'
-        details += f'Check transaction sequence no: {transaction_seq} in XML file\n'
+        session.details += f'Error in processing report id: {upload_id} Error: {str(e)}]\nOn line {lineno}: {line.strip()}\n'
+        session.details += f'Check transaction sequence no: {transaction_seq} in XML file\n'
+
+
+# Function to read the header of an XML report (the elements before its first <transaction>)
+
+# The file is read in chunks until all header_tags are found, the first <transaction> starts, or ReportHeaderReadSize
+# bytes have been read, so the transactions of the report are not read. Returns the texts of the header_tags found
+# (the first element of each tag), or None if the file cannot be read or its header is not well-formed XML
+def read_report_header(xml_file_path, header_tags, read_size):
+    header = {}
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    bytes_read = 0
+    try:
+        with open(xml_file_path, 'rb') as xml_file:
+            while bytes_read < read_size:
+                chunk = xml_file.read(report_header_chunk_size)
+                if not chunk:
+                    break
+                bytes_read += len(chunk)
+                parser.feed(chunk)
+                for event, elem in parser.read_events():
+                    if event == 'start':
+                        if elem.tag == 'transaction':
+                            return header
+                    elif elem.tag in header_tags and elem.tag not in header:
+                        header[elem.tag] = elem.text
+                        if len(header) == len(header_tags):
+                            return header
+    except (OSError, ET.ParseError):
+        return None
+    return header
+
+
+# Function to get the reason an XML report is skipped (not validated) from its header, or None if it is validated
+
+# Reports of types other than ReportTypes are skipped, as process_report does not validate them. Reports of other reporting
+# entities, and reports submitted outside the report start and end dates, are skipped if switched on in goaml_config.ini.
+# Header elements that are missing or cannot be read (in the first ReportHeaderReadSize bytes) do not skip a report,
+# so it is validated (and its issues reported) as usual
+def get_report_skip_reason(settings, xml_file_path, report_entity_id):
+    header = read_report_header(xml_file_path, report_header_tags, settings.report_header_read_size)
+    if not header:
+        return None
+
+    if 'report_code' in header and header['report_code'] not in settings.report_types:
+        return f'report type is not one of {", ".join(settings.report_types)}'
+
+    rentity_id = header.get('rentity_id')
+    if settings.skip_other_reporting_entities and rentity_id is not None and rentity_id.strip().isdecimal():
+        if int(rentity_id) != int(report_entity_id):
+            return f'reporting entity is not RE ID: {report_entity_id}'
+
+    submission_date_text = header.get('submission_date')
+    if settings.skip_reports_outside_dates and submission_date_text is not None:
+        submission_date = parse_date(submission_date_text.strip())
+        if submission_date is not None and not settings.report_start_day <= submission_date.toordinal() <= settings.report_end_day:
+            return f'submitted outside the report dates {settings.report_start_date} to {settings.report_end_date}'
+
+    return None
+
+
+# Function to validate a single XML file and return its results
+
+# The issues of the file are written to issues_file_path, and its upload_ids and details are collected in fresh lists
+# of the session and returned, so that the results of worker processes (parallel validation) and of files replayed from
+# the validation manifest can be merged into the same outputs. The lists and cache counters of the session are restored
+# before returning
+def validate_xml_file(session, xml_file_path, issues_file_path):
+    saved_results = session.reporting_issues, session.issues_upload_ids, session.report_parse_stats, session.details
+    reporting_issues = session.reporting_issues = IssueSink(issues_file_path, header=False)
+    issues_upload_ids = session.issues_upload_ids = UploadIdSet()
+    session.report_parse_stats = []
+    session.details = ''
+    validated, invalid_txn_report = False, 0
+    # Count the cache hits and misses of this file (the cached entries are kept for the next files)
+    validation_caches = session.validation_caches
+    known_good_store = session.known_good_store
+    cache_counts = {name: (cache.hits, cache.misses) for name, cache in validation_caches.items()}
+    saved_known_good_seen = known_good_store.seen
+    known_good_store.seen = set()
+
+    # Extract report_id from the file name (assuming the report_id is part of the file name)
+    report_id = os.path.basename(xml_file_path).split('.')[0]
+    try:
+        # Process the XML file (streamed from disk by the parser)
+        validated, invalid_txn_report = process_report(xml_file_path, report_id, session)
+
+        if memory_usage() > session.settings.memory_threshold_clean:
+            gc.collect()  # Manually trigger garbage collection
+
+    except Exception as e:
+        # Capture the current traceback, format it to a string, and then print it
+        traceback_details = traceback.format_exc()
+        session.details += f'Error in processing report id: {report_id}Error: {str(e)}]\nTraceback details:\n{traceback_details}\n'
+        validated, invalid_txn_report = False, 0
+    finally:
+        reporting_issues.close()
+
+    result = {
+        'report_id': report_id,
+        'validated': validated,
+        'invalid_txn_count': invalid_txn_report,
+        'issues_file': issues_file_path,
+        'issue_count': reporting_issues.row_count,
+        'issues_upload_ids': list(issues_upload_ids),
+        'report_parse_stats': session.report_parse_stats,
+        'cache_stats': {name: (cache.hits - cache_counts[name][0], cache.misses - cache_counts[name][1])
+                        for name, cache in validation_caches.items()},
+        'known_good_seen': list(known_good_store.seen),
+        'details': session.details
+    }
+    session.reporting_issues, session.issues_upload_ids, session.report_parse_stats, session.details = saved_results
+    known_good_store.seen = saved_known_good_seen
+    for name, cache in validation_caches.items():
+        cache.hits, cache.misses = cache_counts[name]
+    return result
+
+
+# Function to get the path of the issues file of an XML file in the issues folder of the run
+def get_issues_file_path(issues_folder, xml_file_path):
+    path_hash = hashlib.sha256(os.path.abspath(xml_file_path).encode('utf-8')).hexdigest()
+    return os.path.join(issues_folder, f'{path_hash[:32]}.csv')
+
+
+# Progress of the XML files validated in a run, sent to the progress_callback of the session: the number of files
+# validated and the throughput (files and MB per second), the number of issues found so far, and the memory usage of the process
+class ValidationProgress:
+    def __init__(self, session, total_files):
+        self.session = session
+        self.total_files = total_files
+        self.files = 0
+        self.megabytes = 0.0
+        self.issues = 0
+        self.start_time = time.monotonic()
+        self.report_time = None
+
+    def update(self, xml_file_path, result, memory_usage_current):
+        self.files += 1
+        self.issues += result['issue_count']
+        try:
+            self.megabytes += os.path.getsize(xml_file_path) / (1024 * 1024)
+        except OSError:
+            pass
+        now = time.monotonic()
+        progress_callback = self.session.progress_callback
+        if progress_callback is None:
+            return
+        # The progress is sent at a throttled rate (and always for the last file)
+        if self.report_time is not None and now - self.report_time < progress_interval and self.files < self.total_files:
+            return
+        self.report_time = now
+        elapsed = max(now - self.start_time, 1e-6)
+        progress_callback({'files': self.files, 'total_files': self.total_files,
+                           'files_per_second': self.files / elapsed, 'mb_per_second': self.megabytes / elapsed,
+                           'issues': self.issues, 'memory_usage': memory_usage_current})
+
+
+# Function to add the cancellation of a run to the details (the results of the files validated so far are kept). The run
+# is marked as aborted, so that it is not taken as a complete run
+def add_cancelled_details(session, validated_files, total_files):
+    session.details += f'Validation was cancelled after {validated_files} of {total_files} XML files, the issues of the validated files were saved\n'
+    session.run_summary.update(aborted='cancelled', cancelled=True)
+
+
+# Function to add the stop of a run at the memory threshold (MemoryThresholdBreak) to the details. The run is marked as
+# aborted, as the files after it are not validated
+def add_memory_break_details(session, memory_usage_current):
+    session.details += f'Memory usage: {memory_usage_current} MB. Breaking loop to prevent out of memory error\n'
+    session.run_summary['aborted'] = 'memory'
+
+
+# Function to validate XML files one after the other in this process
+def validate_xml_files_serial(session, xml_file_list, issues_folder):
+    settings = session.settings
+    results = {}
+    progress = ValidationProgress(session, len(xml_file_list))
+
+    from tqdm.auto import tqdm
+
+    for xml_file_path in tqdm(xml_file_list, desc='Validating XML Reports '):
+        if session.cancel_event.is_set():
+            add_cancelled_details(session, len(results), len(xml_file_list))
+            break
+
+        results[xml_file_path] = validate_xml_file(session, xml_file_path, get_issues_file_path(issues_folder, xml_file_path))
+
+        memory_usage_current = memory_usage()
+        progress.update(xml_file_path, results[xml_file_path], memory_usage_current)
+        if memory_usage_current > settings.memory_threshold_break:
+            add_memory_break_details(session, memory_usage_current)
+            gc.collect()  # Manually trigger garbage collection
+            break
+        elif memory_usage_current > settings.memory_threshold_clean:
+            gc.collect()  # Manually trigger garbage collection
+
+    return results
+
+
+# Function to get the start method of worker processes. While other threads of the process are running (threaded: other
+# sessions are validating, or the session is not validating on the main thread), a worker forked while one of them holds
+# a lock can hang, so the workers are started by a fork server where it is available (None = the default start method of
+# the platform, which is faster to start than a fork server)
+def worker_process_context(threaded):
+    if threaded and 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return None
+
+
+# Pool of worker processes of the parallel validation, shared by the sessions of a batch run (or started for the run of
+# a session). If a worker process dies (such as when it is killed out of memory) the executor of the pool is broken, and
+# a new executor is started for the files that are validated again
+class WorkerPool:
+    def __init__(self, workers, threaded):
+        self.workers = workers
+        self.threaded = threaded
+        self.executor = None
+        self.lock = threading.Lock()
+
+    # Returns the executor of the pool (started on first use, and after the executor broke)
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_process_context(self.threaded))
+            return self.executor
+
+    # Drops a broken executor (once, if the sessions of a batch run all find it broken)
+    def replace_broken(self, executor):
+        with self.lock:
+            if self.executor is executor:
+                self.executor = None
+        executor.shutdown(wait=False)
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+# Function to get the result of an XML file that could not be validated (no issues, and the error in the details)
+def get_failed_file_result(xml_file_path, issues_file_path, error):
+    report_id = os.path.basename(xml_file_path).split('.')[0]
+    # An empty issues file is merged for the file
+    open(issues_file_path, 'w').close()
+    return {'report_id': report_id, 'validated': False, 'invalid_txn_count': 0, 'issues_file': issues_file_path, 'issue_count': 0,
+            'issues_upload_ids': [], 'report_parse_stats': [], 'cache_stats': {}, 'known_good_seen': [],
+            'details': f'Error in processing report id: {report_id} [Error: {error}]\n'}
+
+
+# Function to get the result of an XML file validated by a worker process. Returns None if the pool broke (a worker
+# process died) before the file was validated, and the result of a failed file for other errors (such as a result that
+# could not be sent back by the worker)
+def get_worker_result(future, xml_file_path, issues_file_path):
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        return None
+    except Exception as e:
+        return get_failed_file_result(xml_file_path, issues_file_path, str(e))
+
+
+# Function to validate an XML file in a worker process of its own, the file is failed if the worker process dies
+def validate_xml_file_isolated(session, xml_file_path, issues_file_path, threaded):
+    with ProcessPoolExecutor(max_workers=1, mp_context=worker_process_context(threaded)) as executor:
+        result = get_worker_result(executor.submit(validate_xml_file, session, xml_file_path, issues_file_path), xml_file_path, issues_file_path)
+    if result is None:
+        result = get_failed_file_result(xml_file_path, issues_file_path, 'the worker process stopped while validating the file (such as out of memory)')
+    return result
+
+
+# Function to validate XML files using a pool of worker processes
+
+# Files are submitted largest first so that big reports do not end up running alone at the end of the run.
+# The results are returned by file path, and merged by the caller in the original file order. The session is sent
+# to the workers as its settings, and each worker validates its files with its own session of those settings.
+# The files are validated in the worker pool of the session if it has one (shared by the sessions of a batch run),
+# otherwise in a pool started for the run.
+
+# If a worker process dies, the files that were not validated are validated again: the files the workers had started
+# (their issues file was created) one at a time in a worker process of their own, so that the file that stopped its
+# worker is found (and failed), and the other files in a new executor of the pool. The memory usage of the run is the
+# memory of this process and of the worker processes
+def validate_xml_files_parallel(session, xml_file_list, workers, issues_folder):
+    settings = session.settings
+    results = {}
+    progress = ValidationProgress(session, len(xml_file_list))
+
+    from tqdm.auto import tqdm
+
+    schedule = sorted(xml_file_list, key=os.path.getsize, reverse=True)
+    issues_file_paths = {xml_file_path: get_issues_file_path(issues_folder, xml_file_path) for xml_file_path in schedule}
+    # Remove the issues files of earlier runs, so that the files started by the workers can be told apart
+    for issues_file_path in issues_file_paths.values():
+        if os.path.exists(issues_file_path):
+            os.remove(issues_file_path)
+
+    # Validation off the main thread (such as in the GUI) is threaded as well, the other threads of the process (the
+    # GUI event loop) can hold a lock when the workers are forked
+    threaded = len(running_sessions) > 1 or threading.current_thread() is not threading.main_thread()
+    worker_pool = session.worker_pool or WorkerPool(workers, threaded)
+    try:
+        with tqdm(total=len(schedule), desc='Validating XML Reports ') as progress_bar:
+            while schedule:
+                if session.cancel_event.is_set():
+                    add_cancelled_details(session, len(results), len(xml_file_list))
+                    break
+                executor = worker_pool.get_executor()
+                futures = {}
+                broken_files = []
+                try:
+                    for xml_file_path in schedule:
+                        futures[executor.submit(validate_xml_file, session, xml_file_path, issues_file_paths[xml_file_path])] = xml_file_path
+                except BrokenProcessPool:
+                    # The pool broke (in the files of another session of the batch run) before all files were submitted
+                    broken_files.extend(schedule[len(futures):])
+
+                stopped = False
+                for future in as_completed(futures):
+                    xml_file_path = futures[future]
+                    result = get_worker_result(future, xml_file_path, issues_file_paths[xml_file_path])
+                    if result is None:
+                        broken_files.append(xml_file_path)
+                        continue
+                    results[xml_file_path] = result
+                    progress_bar.update()
+
+                    memory_usage_current = memory_usage(include_workers=True)
+                    progress.update(xml_file_path, result, memory_usage_current)
+                    if session.cancel_event.is_set() and len(results) < len(xml_file_list):
+                        # Drop the files that have not been started yet, and keep the results of the files being validated
+                        running = [pending for pending in futures if not pending.cancel() and futures[pending] not in results]
+                        for pending in running:
+                            result = get_worker_result(pending, futures[pending], issues_file_paths[futures[pending]])
+                            if result is not None:
+                                results[futures[pending]] = result
+                        add_cancelled_details(session, len(results), len(xml_file_list))
+                        stopped = True
+                        break
+                    if memory_usage_current > settings.memory_threshold_break:
+                        add_memory_break_details(session, memory_usage_current)
+                        # Drop the files that have not been started yet, and merge the results received so far
+                        for pending in futures:
+                            pending.cancel()
+                        gc.collect()  # Manually trigger garbage collection
+                        stopped = True
+                        break
+                    elif memory_usage(include_workers=False) > settings.memory_threshold_clean:
+                        gc.collect()  # Manually trigger garbage collection
+                if stopped or not broken_files:
+                    break
+
+                worker_pool.replace_broken(executor)
+                session.details += f'A worker process stopped, {len(broken_files)} XML files are validated again\n'
+                started_files = {xml_file_path for xml_file_path in broken_files if os.path.exists(issues_file_paths[xml_file_path])}
+                for xml_file_path in started_files:
+                    results[xml_file_path] = validate_xml_file_isolated(session, xml_file_path, issues_file_paths[xml_file_path], worker_pool.threaded)
+                    progress_bar.update()
+                    progress.update(xml_file_path, results[xml_file_path], memory_usage(include_workers=True))
+                broken_files = set(broken_files)
+                schedule = [xml_file_path for xml_file_path in schedule if xml_file_path in broken_files and xml_file_path not in started_files]
+    finally:
+        if worker_pool is not session.worker_pool:
+            worker_pool.shutdown()
+
+    return results
+
+
+# Function to add the results of a validated XML file to the outputs of the run (in the session), returns the number of
+# validated reports (0 or 1) and the invalid transactions count of the file
+def merge_validation_result(session, result, issue_sink, upload_ids):
+    issue_sink.append_file(result['issues_file'], result['issue_count'])
+    for upload_id in result['issues_upload_ids']:
+        upload_ids.append(upload_id)
+    session.report_parse_stats.extend(result['report_parse_stats'])
+    session.known_good_store.seen.update(result.get('known_good_seen', ()))
+    for name, (hits, misses) in result.get('cache_stats', {}).items():
+        session.validation_caches[name].hits += hits
+        session.validation_caches[name].misses += misses
+    session.details += result['details']
+    if result['validated']:
+        return 1, result['invalid_txn_count']
+    return 0, 0
+
+
+# Function to get the hash of everything other than the XML file that the validation results depend on
+
+# This is the settings that change the issues of a report (as read from goaml_config.ini, so that comments and formatting
+# do not matter): the report start date, thresholds and report types, the invalid account data, the id and swift code of
+# the reporting entity and the enabled rules. The other settings (such as the worker count, output formats, cache sizes
+# and memory thresholds) do not change the results. The English words list (the size of its automaton, empty without
+# the NLTK corpus), the swift codes file, the version of the reference data and the validator itself are also hashed.
+# Results stored with a different hash are not replayed (the known-good store uses the same hash)
+def validation_config_hash(settings):
+    load_reference_data(settings.reference_data_cache_file)
+    config_hash = hashlib.sha256()
+    config_values = (settings.reporting_window, settings.report_start_day, settings.ctr_threshold,
+                     settings.report_types, settings.incorp_number_reg_types, settings.invalid_acc_prefixes,
+                     settings.invalid_acc_chars, settings.swift_name_match_threshold, settings.check_late_submissions,
+                     settings.report_entity_id, settings.report_entity_swift,
+                     [rule.name for rule in transaction_rules + party_rules if rule.is_enabled(settings)])
+    config_hash.update(repr((validation_manifest_version, reference_data_cache_version, config_values,
+                             len(english_word_automaton.child_labels))).encode('utf-8'))
+    for source_file in ('./RE_swift_codes.csv', __file__):
+        if file_signature(source_file) is not None:
+            config_hash.update(file_content_hash(source_file).encode('ascii'))
+    return config_hash.hexdigest()
+
+
+# Function to read the validation manifest (ValidationManifest in goaml_config.ini), returns the manifest entries
+# by absolute file path, or an empty dictionary if there is no manifest (or it is switched off)
+def load_validation_manifest(settings):
+    if not settings.validation_manifest_file:
+        return {}
+    try:
+        with open(settings.validation_manifest_file, 'rb') as manifest_file:
+            manifest = pickle.load(manifest_file)
+        if manifest.get('version') == validation_manifest_version:
+            return manifest['files']
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+        pass
+    return {}
+
+
+# Function to get the stored results of an XML file if the file has not changed since it was validated
+
+# A file with the same size and modification time is taken as unchanged. If only the modification time is
+# different (such as a file copied again), the content hash is compared, and the entry is updated if it is the same.
+# The issues of the file are replayed from its issues file in the issues folder of the manifest
+def get_unchanged_file_result(manifest, xml_file_path, config_hash):
+    entry = manifest.get(os.path.abspath(xml_file_path))
+    signature = file_signature(xml_file_path)
+    if entry is None or signature is None or entry['config_hash'] != config_hash or entry['size'] != signature[1]:
+        return None
+    if not os.path.exists(entry['result']['issues_file']):
+        return None
+    if entry['mtime_ns'] != signature[2]:
+        if file_content_hash(xml_file_path) != entry['content_hash']:
+            return None
+        entry['mtime_ns'] = signature[2]
+    return entry['result']
+
+
+# Function to save the results of the validated XML files to the validation manifest
+
+# Results of files that could not be processed (errors in details) are not saved, so that those files are validated
+# again. Entries of files in other folders are kept, and entries of files removed from the validated folder are dropped
+# (with their issues files)
+def save_validation_manifest(settings, manifest, xml_folder_path, xml_file_list, results, config_hash):
+    folder_path = os.path.abspath(xml_folder_path)
+    current_files = {os.path.abspath(xml_file_path) for xml_file_path in xml_file_list}
+    for file_path in list(manifest):
+        if file_path not in current_files and os.path.dirname(file_path) == folder_path:
+            entry = manifest.pop(file_path)
+            try:
+                os.remove(entry['result']['issues_file'])
+            except OSError:
+                pass
+
+    for xml_file_path, result in results.items():
+        signature = file_signature(xml_file_path)
+        if result['details'] or signature is None:
+            manifest.pop(os.path.abspath(xml_file_path), None)
+            continue
+        manifest[signature[0]] = {
+            'size': signature[1],
+            'mtime_ns': signature[2],
+            'content_hash': file_content_hash(xml_file_path),
+            'config_hash': config_hash,
+            'result': {key: value for key, value in result.items() if key != 'cache_stats'}
+        }
+
+    write_cache_file(settings.validation_manifest_file, {'version': validation_manifest_version, 'files': manifest})
+
+
+# Function to write the first max_rows issues of the issues CSV file to an Excel file
+
+# The rows are streamed from the CSV file to the workbook (openpyxl write-only mode), so the issues are not loaded
+# in memory. The header is formatted as in files written by pandas
+def write_issues_excel(issues_csv_path, excel_path, max_rows):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Sheet1')
+    with open(issues_csv_path, 'r', newline='', encoding='utf-8') as issues_file:
+        issues_reader = csv.reader(issues_file)
+        header_cells = []
+        for column in next(issues_reader):
+            header_cell = WriteOnlyCell(worksheet, value=column)
+            header_cell.font = Font(bold=True)
+            header_cell.border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+            header_cell.alignment = Alignment(horizontal='center', vertical='top')
+            header_cells.append(header_cell)
+        worksheet.append(header_cells)
+        for row in itertools.islice(issues_reader, max_rows):
+            worksheet.append([value if value != '' else None for value in row])
+    workbook.save(excel_path)
+
+
+# Function to get the summary of a run of a Reporting Entity before its files are validated (the totals are set by the run)
+def get_run_summary(report_entity_name, report_entity_id, report_entity_swift, xml_folder_path, output_path):
+    return {'report_entity_name': report_entity_name, 'report_entity_id': report_entity_id,
+            'report_entity_swift': report_entity_swift, 'input_folder': xml_folder_path, 'output_folder': output_path,
+            'xml_files': 0, 'skipped_files': {}, 'replayed_files': 0, 'validated_reports': 0, 'failed_reports': 0,
+            'all_files_skipped': False, 'issues': 0, 'reports_with_issues': 0, 'flagged_transactions': 0,
+            'cancelled': False, 'aborted': None, 'output_files': [], 'error': None}
 
 
 # Function to validate XML reports submitted by a Reporting Entity (RE)
 
 # This function validates all XML files in the specified local folder 
-# by passing them to function 'process_report(xml_content, report_id)'.
+# by passing them to function 'process_report(xml_file_path, report_id)'.
 # It keeps track of memory usage after validating each XML file, and breaks the loop if it exceeds predefined threshold
 # in config file to prevent out of memory issues. After validating all XML files, this function processes the
 # lists of validation issues and uploa_ids of relevant XML files, and saves them to files for later usage. It also cleans
-# memory after validating each XML file for efficient memory management
-
-def validate_reporting_entity_local(report_entity_name, report_entity_id, report_entity_swift, xml_folder_path):
-    global details
+# memory after validating each XML file for efficient memory management.
+# XML files that have not changed since the last run are not validated again, their issues are taken from the
+# validation manifest, so that the outputs and totals are the same as validating all files.
+# Issues are written to the issues CSV (and Parquet) file of the run as the results of each file are merged, so they
+# are never all held in memory
+
+def validate_reporting_entity_local(report_entity_name, report_entity_id, report_entity_swift, xml_folder_path, session=None):
+    if session is None:
+        session = get_default_session()
+    settings = session.settings
+    output_path = session.output_path
+    running_sessions.add(session)
     # Initialize xml_reports at the start of the function
     xml_reports = 0
     invalid_transaction_count = 0
+    issues_folder = None
+    # A cancellation of an earlier run does not cancel this run
+    session.cancel_event.clear()
+    session.issues_csv_file = ''
+    run_summary = session.run_summary = get_run_summary(report_entity_name, report_entity_id, report_entity_swift, xml_folder_path, output_path)
 
     try:
-        details += f''
-        details += f'Obtaining XML files for {report_entity_name} RE ID: {report_entity_id}  SWIFT: {report_entity_swift}\n'
+        session.details += f''
+        session.details += f'Obtaining XML files for {report_entity_name} RE ID: {report_entity_id}  SWIFT: {report_entity_swift}\n'
+
+        # Cache and parse statistics are counted for each run
+        for cache in session.validation_caches.values():
+            cache.hits = cache.misses = 0
+        report_parse_stats = session.report_parse_stats = []
+
+        # Load the reference data before starting worker processes (they inherit it, or read the cache file written here)
+        load_reference_data(settings.reference_data_cache_file)
+        if not english_word_automaton.child_labels:
+            session.details += 'NLTK words corpus not found: account numbers are not checked for English words (install it with: main.py --download-nltk-words)\n'
+        disabled_rules = get_disabled_rules(settings)
+        if disabled_rules:
+            session.details += f'Validation rules switched off: {", ".join(disabled_rules)}\n'
 
         # Obtain list of XML files in the specified folder
-        xml_file_list = glob.glob(os.path.join(xml_folder_path, '*.xml'))
-        details += f"Total XML files: {len(xml_file_list)}\n"
-
-        for xml_file_path in tqdm(xml_file_list, desc='Validating XML Reports '):
-            try:
-                # Read the XML content from the file
-                with open(xml_file_path, 'r') as xml_file:
-                    xml_content = xml_file.read()
-
-                # Extract report_id from the file name (assuming the report_id is part of the file name)
-                report_id = os.path.basename(xml_file_path).split('.')[0]
-
-                # Process the fetched XML content
-                validated, invalid_txn_report = process_report(xml_content, report_id)
-                if validated:
-                    xml_reports += 1
+        folder_file_list = glob.glob(os.path.join(xml_folder_path, '*.xml'))
+        session.details += f"Total XML files: {len(folder_file_list)}\n"
+
+        # Skip the reports that are not validated (other report types, reporting entities or dates), from the header
+        # of each file, so they are not read in full
+        xml_file_list = []
+        skipped_file_counts = {}
+        for xml_file_path in folder_file_list:
+            skip_reason = get_report_skip_reason(settings, xml_file_path, report_entity_id)
+            if skip_reason is None:
+                xml_file_list.append(xml_file_path)
+            else:
+                skipped_file_counts[skip_reason] = skipped_file_counts.get(skip_reason, 0) + 1
+        for skip_reason, skipped_file_count in skipped_file_counts.items():
+            session.details += f'{skipped_file_count} XML files were skipped: {skip_reason}\n'
+        # Skipping every file of the folder is reported as a warning (not as a run without issues), the dates, report
+        # types or reporting entity of the config file are likely not the ones of the reports
+        all_files_skipped = bool(folder_file_list) and not xml_file_list
+        if all_files_skipped:
+            session.details += f'WARNING: all {len(folder_file_list)} XML files were skipped, none of the reports were validated. Check ReportStartDate, ReportEndDate, ReportTypes and ReportingEntityID in the config file\n'
+        run_summary.update(xml_files=len(folder_file_list), skipped_files=skipped_file_counts, all_files_skipped=all_files_skipped)
+
+        # Take the results of the files that have not changed since the last run from the validation manifest. The issues
+        # files of the validated XML files are kept in the issues folder of the manifest (or a temporary folder without it)
+        manifest = load_validation_manifest(settings)
+        config_hash = validation_config_hash(settings) if settings.validation_manifest_file else None
+        if settings.validation_manifest_file:
+            issues_folder = settings.validation_issues_folder
+            os.makedirs(issues_folder, exist_ok=True)
+        else:
+            issues_folder = tempfile.mkdtemp(prefix='goaml_issues_')
+        replayed_results = {}
+        for xml_file_path in xml_file_list:
+            result = get_unchanged_file_result(manifest, xml_file_path, config_hash)
+            if result is not None:
+                replayed_results[xml_file_path] = result
+        changed_file_list = [xml_file_path for xml_file_path in xml_file_list if xml_file_path not in replayed_results]
+        run_summary['replayed_files'] = len(replayed_results)
+        if replayed_results:
+            session.details += f'{len(replayed_results)} XML files have not changed since the last run, their issues were taken from the validation manifest\n'
+
+        # Validate the files in a pool of worker processes if more than one worker is configured (or in the worker pool
+        # of the batch run)
+        if changed_file_list and (session.worker_pool is not None or settings.validation_workers > 1 and len(changed_file_list) > 1):
+            session.details += f'Validating {len(changed_file_list)} XML files with {settings.validation_workers} worker processes\n'
+            results = validate_xml_files_parallel(session, changed_file_list, settings.validation_workers, issues_folder)
+        else:
+            results = validate_xml_files_serial(session, changed_file_list, issues_folder)
+
+        # Merge the results in the original file order, so the output files are the same as validating all files
+        if not os.path.exists(output_path):
+            os.makedirs(output_path)
+        issues_csv_path = f'{output_path}/report_issues_all_[{report_entity_name}_{report_entity_id}].csv'
+        issues_parquet_path = f'{output_path}/report_issues_all_[{report_entity_name}_{report_entity_id}].parquet' if settings.use_pyarrow and 'parquet' in settings.output_formats else None
+        issue_sink = IssueSink(issues_csv_path, issues_parquet_path)
+        upload_ids = UploadIdSet()
+        try:
+            for xml_file_path in xml_file_list:
+                result = results.get(xml_file_path, replayed_results.get(xml_file_path))
+                if result is not None:
+                    validated, invalid_txn_report = merge_validation_result(session, result, issue_sink, upload_ids)
+                    xml_reports += validated
                     # Add the invalid transactions count of the report to the total count
                     invalid_transaction_count += invalid_txn_report
-
-                # Explicitly delete the large object
-                del xml_content
-
-                memory_usage_current = memory_usage()
-                if memory_usage_current > memory_threshold_break:
-                    details += f'Memory usage: {memory_usage_current} MB. Breaking loop to prevent out of memory error\n'
-                    gc.collect()  # Manually trigger garbage collection
-                    break
-                elif memory_usage_current > memory_threshold_clean:
-                    gc.collect()  # Manually trigger garbage collection
-
-            except Exception as e:
-                # Capture the current traceback, format it to a string, and then print it
-                traceback_details = traceback.format_exc()
-                details += f'Error in processing report id: {report_id}Error: {str(e)}]\nTraceback details:\n{traceback_details}\n'
-                continue
-
-        # Convert issues lists to dataframes and write them to Excel files. If rows exceed 900,000 (Excel max), write only top 900,000 records
-        df_reporting_issues = pd.DataFrame(reporting_issues)
-        df_issues_upload_ids = pd.DataFrame(issues_upload_ids)
-        global output_path
-        if not df_reporting_issues.empty:
-            details += f'There are issues in the XML Reports  !!!\n'
-            #output_directory = 'validation_results'
-            if not os.path.exists(output_path):
-                os.makedirs(output_path)
-                
-            # Apply the function to each element in the 'issue' column
-            df_reporting_issues['issue'] = df_reporting_issues['issue'].apply(parse_list)
-
-            # Handle NaN values: convert them to empty lists
-            df_reporting_issues['issue'] = df_reporting_issues['issue'].apply(lambda x: x if isinstance(x, list) else [])
-
-            # Now the 'issue' column can be safely exploded
-            df_reporting_issues = df_reporting_issues.explode('issue')
-            timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M')
-
-            # If error records are more than Excel can handle, save as CVS file and save top portion to Excel
-            if df_reporting_issues.shape[0] > max_rows_excel:
-                details += f'There are {df_reporting_issues.shape[0]} issues. Limiting to 900,000 reporting issues for saving to Excel file ...\n'
-                issues_file_name = f'{output_path}/report_issues_all_[{report_entity_name}_{report_entity_id}].csv'
-                df_reporting_issues.to_csv(issues_file_name, index=False)
-                df_reporting_issues.head(max_rows_excel).to_excel(f'{output_path}/report_issues_part_[{report_entity_name}_{report_entity_id}].xlsx', index=False, engine='openpyxl')
-                details += f'Reporting issues were saved to file: {issues_file_name}\n'
-            
+        finally:
+            issue_sink.close()
+
+        if settings.validation_manifest_file:
+            save_validation_manifest(settings, manifest, xml_folder_path, folder_file_list, results, config_hash)
+        if session.known_good_store.enabled:
+            session.known_good_store.save()
+
+        # Write the issues to an Excel file. If rows exceed 900,000 (Excel max), write only top 900,000 records
+        if issue_sink.row_count > 0:
+            session.details += f'There are issues in the XML Reports  !!!\n'
+            if 'csv' in settings.output_formats:
+                session.details += f'All reporting issues were saved to file: {issues_csv_path}\n'
+                run_summary['output_files'].append(issues_csv_path)
+            if issues_parquet_path is not None:
+                run_summary['output_files'].append(issues_parquet_path)
+
+            if 'xlsx' in settings.output_formats:
+                # If error records are more than Excel can handle, save top portion to Excel
+                if issue_sink.row_count > settings.max_rows_excel:
+                    session.details += f'There are {issue_sink.row_count} issues. Limiting to 900,000 reporting issues for saving to Excel file ...\n'
+                    issues_file_name = f'{output_path}/report_issues_part_[{report_entity_name}_{report_entity_id}].xlsx'
+                else:
+                    issues_file_name = f'{output_path}/report_issues_[{report_entity_name}_{report_entity_id}].xlsx'
+                write_issues_excel(issues_csv_path, issues_file_name, settings.max_rows_excel)
+                session.details += f'Reporting issues were saved to file: {issues_file_name}\n'
+                run_summary['output_files'].append(issues_file_name)
+
+            # The issues CSV file is written for the other output files (and the issue browser), and removed if
+            # it is not one of the output formats
+            if 'csv' in settings.output_formats:
+                session.issues_csv_file = issues_csv_path
             else:
-                issues_file_name = f'{output_path}/report_issues_[{report_entity_name}_{report_entity_id}].xlsx'
-                df_reporting_issues.to_excel(issues_file_name, index=False, engine='openpyxl')
-                details += f'Reporting issues were saved to file: {issues_file_name}\n'
+                os.remove(issues_csv_path)
         else:
-            details += f'Reporting issues were not found !!!\n'
-                
-        if not df_issues_upload_ids.empty:
-            # Remove the duplicates of the dataframe and save to file for later usage (download XML reports)
-            df_issues_upload_ids.drop_duplicates(inplace=True)
-            df_issues_upload_ids.to_csv(f'{output_path}/{report_entity_name}_upload_ids.csv', index=False)
+            os.remove(issues_csv_path)
+            session.details += f'Reporting issues were not found !!!\n'
+
+        if upload_ids:
+            # Save the upload ids of reports with issues for later usage (download XML reports)
+            with open(f'{output_path}/{report_entity_name}_upload_ids.csv', 'w', newline='', encoding='utf-8') as upload_ids_file:
+                upload_ids_writer = csv.writer(upload_ids_file)
+                upload_ids_writer.writerow(['0'])
+                upload_ids_writer.writerows([upload_id] for upload_id in upload_ids)
+            run_summary['output_files'].append(f'{output_path}/{report_entity_name}_upload_ids.csv')
+
+        # Save the number of transactions and peak number of parsed elements of each report
+        if report_parse_stats:
+            with open(f'{output_path}/{report_entity_name}_parse_stats.csv', 'w', newline='', encoding='utf-8') as parse_stats_file:
+                parse_stats_writer = csv.DictWriter(parse_stats_file, fieldnames=['report_id', 'transactions', 'peak_elements'])
+                parse_stats_writer.writeheader()
+                parse_stats_writer.writerows(report_parse_stats)
+            run_summary['output_files'].append(f'{output_path}/{report_entity_name}_parse_stats.csv')
+
+        run_summary.update(validated_reports=xml_reports, issues=issue_sink.row_count, reports_with_issues=len(upload_ids),
+                           flagged_transactions=invalid_transaction_count,
+                           failed_reports=sum(1 for result in results.values() if result['details']))
         
         if xml_reports > 0:
-            details += f'Total of {xml_reports} XML files have been processed.\n'
-            details += f'There are {len(df_reporting_issues)} issues in {len(df_issues_upload_ids)} reports to be rectified\n'
-            details += f'Total flagged transactions: {invalid_transaction_count}\n'
+            session.details += f'Total of {xml_reports} XML files have been processed.\n'
+            session.details += f'There are {issue_sink.row_count} issues in {len(upload_ids)} reports to be rectified\n'
+            session.details += f'Total flagged transactions: {invalid_transaction_count}\n'
+            session.details += f'Peak parsed elements in a report: {max(parse_stats["peak_elements"] for parse_stats in report_parse_stats)}\n'
+            for name, cache in session.validation_caches.items():
+                lookups = cache.hits + cache.misses
+                if lookups:
+                    session.details += f'{name}: {cache.hits} hits, {cache.misses} misses ({cache.hits / lookups:.1%} hit rate)\n'
             
         else:
-            details += f'No files were validated'
+            session.details += f'No files were validated'
         
-        details += f'Memory Usage: {memory_usage():.2f} MB\n'
-        details += f'---------------------------------------------------------------------'
+        session.details += f'Memory Usage: {memory_usage():.2f} MB\n'
+        session.details += f'---------------------------------------------------------------------'
         
     except Exception as e:
-        details += f'Error in executing script for {report_entity_name} [Error: {str(e)}]\n'
-
-class Window(QMainWindow):
-    def __init__(self):
-        super().__init__()
-
-        self.setGeometry(500, 500, 500, 400)
-        self.setWindowTitle("GOAML Tool")
-
-        # Create central widget and layout
-        self.central_widget = QWidget()
-        self.setCentralWidget(self.central_widget)
-        self.layout = QVBoxLayout()
-
-        # Input Folder Label and Button
-        self.input_label = QLabel("Input Folder: None")
-        self.layout.addWidget(self.input_label)
-
-        self.input_button = QPushButton("Select Input Folder")
-        self.input_button.clicked.connect(self.select_input_folder)
-        self.layout.addWidget(self.input_button)
-
-        # Output Folder Label and Button
-        self.output_label = QLabel("Output Folder: None")
-        self.layout.addWidget(self.output_label)
-
-        self.output_button = QPushButton("Select Output Folder")
-        self.output_button.clicked.connect(self.select_output_folder)
-        self.layout.addWidget(self.output_button)
-
-        # Validate Button
-        self.validate_button = QPushButton("Validate Configuration")
-        self.validate_button.clicked.connect(self.validateButton)
-        self.layout.addWidget(self.validate_button)
-
-        # Output Details Label
-        self.output_details_label = QLabel("")
-        self.layout.addWidget(self.output_details_label)
-
-        self.central_widget.setLayout(self.layout)
-
-
-
-          # Dictionary to hold swift codes and institution names, which is used in the function to check if a given swift code for an account institution matches its institution name
-   
-
-    # Method to select input folder
-    def select_input_folder(self):
-        global local_folder_path
-        folder = QFileDialog.getExistingDirectory(self, "Select Input Folder")
-     
-        if folder:
-            self.input_label.setText(f"Input Folder: {folder}")
-            local_folder_path=folder
-
-   
-    # Method to select output folder
-    def select_output_folder(self):
-        global output_path
-    
-        folder = QFileDialog.getExistingDirectory(self, "Select Output Folder")
-        if folder:
-            self.output_label.setText(f"Output Folder: {folder}")
-            output_path=folder
-            
-
-    # Method to validate the configuration
-    def validateButton(self):
-        global details
-        details = "Configuration Parameters:\n"
-        details += f"reporting_window = {reporting_window}\n"
-        details += f"report_start_date = {report_start_date}\n"
-        details += f"report_end_date = {report_end_date}\n"
-        details += f"ctr_threshold = {ctr_threshold}\n"
-        details += f"report_types = {report_types}\n"
-        details += f"incorp_number_reg_types = {incorp_number_reg_types}\n"
-        details += f"invalid_acc_prefixes = {invalid_acc_prefixes}\n"
-        details += f"invalid_acc_chars = {invalid_acc_chars}\n"
-        details += f"swift_name_match_threshold = {swift_name_match_threshold}\n"
-        details += f"check_late_submissions = {check_late_submissions}\n"
-        details += f"input = {local_folder_path}\n"
-        details += f"output = {output_path}\n"
-        details += f"----------------------------------------------------------------------------\n"
-        try: 
-           details +=f'Validating Reports of {report_entity_name} (rentity_id: {report_entity_id}, SWIFT: {report_entity_swift})\n'
-           details +='---------------------------------------------------------------------\n'
-   
-  
-           validate_reporting_entity_local(report_entity_name, report_entity_id, report_entity_swift, local_folder_path)
-
-           details +='\n'
-           details +='All reports have been processed.\n'
-           self.output_details_label.setText(details)
-           # Clean memory
-           gc.collect()
-
-        except Exception as e:
-           details += f'Error in executing script for {report_entity_name} [Error: {str(e)}]\n'
-           # Clean memory
-           gc.collect()
-
-        # Display the details in the output details label
-        
-        
+        session.details += f'Error in executing script for {report_entity_name} [Error: {str(e)}]\n'
+        run_summary['error'] = str(e)
+    finally:
+        running_sessions.discard(session)
+        # Issues files of a run without validation manifest are only kept until they are merged
+        if issues_folder is not None and not settings.validation_manifest_file:
+            shutil.rmtree(issues_folder, ignore_errors=True)
+
+# Prefix of the config sections of the reporting entities of a batch run ([RE_DATA:<label>] sections, with the keys of
+# [RE_DATA] and the InputFolder of the XML reports of the entity)
+re_section_prefix = 'RE_DATA:'
+# Columns of a reporting entity manifest (CSV file of the reporting entities of a batch run and their input folders)
+re_manifest_columns = ('ReportingEntityID', 'ReportingEntityName', 'ReportingEntitySwift', 'InputFolder')
+# Columns of the consolidated summary of a batch run (one row for each reporting entity)
+entities_summary_columns = ('report_entity_id', 'report_entity_name', 'report_entity_swift', 'input_folder', 'output_folder',
+                            'xml_files', 'skipped_files', 'all_files_skipped', 'replayed_files', 'validated_reports',
+                            'failed_reports', 'issues', 'reports_with_issues', 'flagged_transactions', 'cancelled', 'aborted', 'error')
+
+
+# Function to read the reporting entities of a batch run from the [RE_DATA:<label>] sections of the settings
+def read_reporting_entity_sections(settings):
+    entities = []
+    for section in settings.config.sections():
+        if section.startswith(re_section_prefix):
+            entities.append({key: settings.config[section].get(key, '').strip() for key in re_manifest_columns})
+    return entities
+
+
+# Function to read the reporting entities of a batch run from a reporting entity manifest (CSV file with the
+# re_manifest_columns). Relative input folders are taken from the folder of the manifest
+def read_reporting_entity_manifest(manifest_path):
+    manifest_folder = os.path.dirname(os.path.abspath(manifest_path))
+    entities = []
+    with open(manifest_path, 'r', newline='', encoding='utf-8-sig') as manifest_file:
+        for row in csv.DictReader(manifest_file):
+            entity = {key: (row.get(key) or '').strip() for key in re_manifest_columns}
+            if entity['InputFolder']:
+                entity['InputFolder'] = os.path.join(manifest_folder, entity['InputFolder'])
+            entities.append(entity)
+    return entities
+
+
+# Function to check the reporting entities of a batch run, returns the errors found (empty if they can be validated)
+def check_reporting_entities(entities):
+    if not entities:
+        return [f'No reporting entities to validate (give a reporting entity manifest, or [{re_section_prefix}<label>] sections in the config file)']
+    errors = []
+    entity_ids = set()
+    for position, entity in enumerate(entities, 1):
+        missing_values = [key for key in re_manifest_columns if not entity[key]]
+        if missing_values:
+            errors.append(f'Reporting entity {position}: {", ".join(missing_values)} not given')
+        elif not entity['ReportingEntityID'].isdecimal():
+            errors.append(f'Reporting entity {position}: ReportingEntityID is not a number: {entity["ReportingEntityID"]}')
+        elif int(entity['ReportingEntityID']) in entity_ids:
+            errors.append(f'Reporting entity {position}: RE ID {entity["ReportingEntityID"]} is given more than once')
+        elif not os.path.isdir(entity['InputFolder']):
+            errors.append(f'Reporting entity {position}: input folder not found: {entity["InputFolder"]}')
+        else:
+            entity_ids.add(int(entity['ReportingEntityID']))
+    return errors
+
+
+# Function to get the settings of a reporting entity of a batch run: the settings of the config file (without the
+# [RE_DATA:<label>] sections) with the [RE_DATA] of the entity. Each entity has its own validation manifest and known-good
+# store (the files of the config file with the RE ID added to the name), as several entities are validated at the same time
+def get_entity_settings(settings, entity):
+    config_values = {section: values for section, values in settings.config_values.items() if not section.startswith(re_section_prefix)}
+    system_values = {}
+    for key, cache_file in (('ValidationManifest', settings.validation_manifest_file), ('KnownGoodStore', settings.known_good_store_file)):
+        if cache_file:
+            cache_file_name, cache_file_extension = os.path.splitext(cache_file)
+            system_values[key] = f'{cache_file_name}_{int(entity["ReportingEntityID"])}{cache_file_extension}'
+    entity_values = {key: entity[key] for key in ('ReportingEntityID', 'ReportingEntityName', 'ReportingEntitySwift')}
+    return ValidationSettings(config_values).with_values({'RE_DATA': entity_values, 'SYSTEM_DATA': system_values})
+
+
+# Function to validate a reporting entity of a batch run in its own session (the outputs are saved to the folder of the
+# entity in output_path), returns the run summary and details of the entity
+def validate_batch_entity(settings, entity, output_path, worker_pool):
+    try:
+        entity_settings = get_entity_settings(settings, entity)
+        session = ValidationSession(entity_settings)
+    except Exception as e:
+        # The run of the entity fails, the other entities are validated
+        run_summary = get_run_summary(entity['ReportingEntityName'], entity['ReportingEntityID'], entity['ReportingEntitySwift'],
+                                      entity['InputFolder'], None)
+        run_summary['error'] = str(e)
+        return run_summary, f'Error in executing script for {entity["ReportingEntityName"]} [Error: {str(e)}]\n'
+    session.worker_pool = worker_pool
+    session.local_folder_path = entity['InputFolder']
+    session.output_path = f'{output_path}/{entity_settings.report_entity_name}_{entity_settings.report_entity_id}'
+    validate_reporting_entity_local(entity_settings.report_entity_name, entity_settings.report_entity_id,
+                                    entity_settings.report_entity_swift, session.local_folder_path, session)
+    return session.run_summary, session.details
+
+
+# Function to validate the XML reports of several Reporting Entities in one run (batch run)
+
+# The reference data is loaded once for all entities, and each entity is validated in its own session. With more than one
+# worker, the entities share one pool of worker processes, and up to ValidationWorkers entities are validated at the same
+# time (on threads), so that the files of other entities keep the workers busy while the issues of an entity are merged
+# and saved. The run summaries of the entities are saved to the consolidated summary file of the batch (entities_summary.csv
+# in output_path). Returns the summary of the batch (with the run summary of each entity) and the details of the entities
+def validate_reporting_entities(settings, entities, output_path):
+    load_reference_data(settings.reference_data_cache_file)
+
+    if settings.validation_workers > 1 and len(entities) > 1:
+        worker_pool = WorkerPool(settings.validation_workers, True)
+        try:
+            with ThreadPoolExecutor(max_workers=min(settings.validation_workers, len(entities))) as entity_runs:
+                futures = [entity_runs.submit(validate_batch_entity, settings, entity, output_path, worker_pool) for entity in entities]
+                entity_results = [future.result() for future in futures]
+        finally:
+            worker_pool.shutdown()
+    else:
+        entity_results = [validate_batch_entity(settings, entity, output_path, None) for entity in entities]
+    run_summaries = [run_summary for run_summary, details in entity_results]
+
+    # Save the consolidated summary of the entities (the skipped files are counted for all skip reasons)
+    os.makedirs(output_path, exist_ok=True)
+    entities_summary_path = f'{output_path}/entities_summary.csv'
+    with open(entities_summary_path, 'w', newline='', encoding='utf-8') as entities_summary_file:
+        entities_summary_writer = csv.DictWriter(entities_summary_file, fieldnames=entities_summary_columns, extrasaction='ignore')
+        entities_summary_writer.writeheader()
+        for run_summary in run_summaries:
+            entities_summary_writer.writerow(dict(run_summary, skipped_files=sum(run_summary['skipped_files'].values())))
+
+    batch_summary = {'entities': len(run_summaries), 'output_folder': output_path, 'entities_summary_file': entities_summary_path,
+                     'failed_entities': sum(1 for run_summary in run_summaries if run_summary['error'] is not None)}
+    for key in ('xml_files', 'replayed_files', 'validated_reports', 'failed_reports', 'issues', 'reports_with_issues', 'flagged_transactions'):
+        batch_summary[key] = sum(run_summary[key] for run_summary in run_summaries)
+    batch_summary['runs'] = run_summaries
+    return batch_summary, ''.join(f'{details}\n' for run_summary, details in entity_results)
+
+
+# Exit codes of the command line mode
+exit_code_no_issues = 0
+exit_code_issues = 1
+# Invalid arguments or config file (as the argument parser)
+exit_code_usage = 2
+# The run failed, some XML files could not be processed, or the run was stopped before all files were validated
+# (cancelled, or MemoryThresholdBreak)
+exit_code_failed = 3
+# All XML files of the input folder (of a reporting entity) were skipped, no report was validated
+exit_code_all_skipped = 4
+
+
+# Function to read the command line arguments. Without --input or --entities (or --clear-known-good-store and
+# --download-nltk-words) the GUI is started
+def parse_arguments(arguments):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Validate the goAML XML reports of a Reporting Entity. The GUI is started if --input or --entities is not given.')
+    parser.add_argument('--input', help='folder of the XML reports to validate, without the GUI')
+    parser.add_argument('--entities', nargs='?', const='', metavar='MANIFEST',
+                        help='validate several reporting entities in one run, without the GUI: a CSV file with the columns '
+                             f'{", ".join(re_manifest_columns)}, or (without a file) the [{re_section_prefix}<label>] sections of the config file')
+    parser.add_argument('--output', help='folder of the output files (required with --input and --entities)')
+    parser.add_argument('--config', help='config file (default: goaml_config.ini)')
+    parser.add_argument('--workers', type=int, help='number of worker processes (1 = serial, 0 = one per CPU core)')
+    parser.add_argument('--formats', help='output files of the reporting issues, comma separated: csv, xlsx, parquet')
+    parser.add_argument('--summary', help='file to write the JSON run summary to (it is always written to stdout)')
+    parser.add_argument('--clear-known-good-store', action='store_true',
+                        help='clear the known-good store (persons, entities and accounts are validated in full again)')
+    parser.add_argument('--download-nltk-words', action='store_true',
+                        help='download the NLTK words corpus (account numbers are checked for English words once it is installed)')
+    return parser.parse_args(arguments)
+
+
+# Function to validate the reports of the input folder (or of the reporting entities of a batch run) without the GUI
+# (PyQt5 is not imported)
+
+# The run summary is written to stdout as JSON (and to the --summary file), and the details of the run to stderr.
+# Returns the exit code: no issues, issues found, invalid arguments, failed run (or XML files that could not be processed),
+# or all XML files skipped
+def run_cli(arguments):
+    if arguments.output is None:
+        print('--output is required with --input and --entities', file=sys.stderr)
+        return exit_code_usage
+    if arguments.input is not None and arguments.entities is not None:
+        print('--input and --entities cannot be given together', file=sys.stderr)
+        return exit_code_usage
+    if arguments.input is not None and not os.path.isdir(arguments.input):
+        print(f'Input folder not found: {arguments.input}', file=sys.stderr)
+        return exit_code_usage
+
+    settings = read_cli_settings(arguments.config or config_file)
+    if settings is None:
+        return exit_code_usage
+
+    # The worker count and output formats of the command line replace the values of the config file
+    changed_values = {}
+    if arguments.workers is not None:
+        changed_values['ValidationWorkers'] = arguments.workers
+    if arguments.formats is not None:
+        formats = [output_format.strip().lower() for output_format in arguments.formats.split(',') if output_format.strip()]
+        if not set(formats) <= {'csv', 'xlsx', 'parquet'}:
+            print(f'Invalid output formats: {arguments.formats} (formats: csv, xlsx, parquet)', file=sys.stderr)
+            return exit_code_usage
+        changed_values['OutputFormats'] = ', '.join(formats)
+    if changed_values:
+        settings = settings.with_values({'SYSTEM_DATA': changed_values})
+
+    if arguments.entities is not None:
+        return run_batch_cli(arguments, settings)
+
+    session = ValidationSession(settings)
+    session.local_folder_path = arguments.input
+    session.output_path = arguments.output
+    validate_reporting_entity_local(settings.report_entity_name, settings.report_entity_id,
+                                    settings.report_entity_swift, session.local_folder_path, session)
+    print(session.details, file=sys.stderr)
+
+    exit_code = get_exit_code([session.run_summary])
+    write_cli_summary(dict(session.run_summary, config_file=arguments.config or config_file, exit_code=exit_code), arguments.summary)
+    return exit_code
+
+
+# Function to validate the reporting entities of the --entities manifest (or of the config file) without the GUI
+
+# The summary of the batch (totals and the run summary of each entity) is written as the summary of the run
+def run_batch_cli(arguments, settings):
+    try:
+        if arguments.entities:
+            entities = read_reporting_entity_manifest(arguments.entities)
+        else:
+            entities = read_reporting_entity_sections(settings)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f'Reporting entity manifest cannot be read: {arguments.entities} [Error: {str(e)}]', file=sys.stderr)
+        return exit_code_usage
+    entity_errors = check_reporting_entities(entities)
+    if entity_errors:
+        print('\n'.join(entity_errors), file=sys.stderr)
+        return exit_code_usage
+
+    batch_summary, details = validate_reporting_entities(settings, entities, arguments.output)
+    print(details, file=sys.stderr)
+
+    exit_code = get_exit_code(batch_summary['runs'])
+    write_cli_summary(dict(batch_summary, config_file=arguments.config or config_file, exit_code=exit_code), arguments.summary)
+    return exit_code
+
+
+# Function to get the exit code of the command line mode from the run summaries of the validated reporting entities
+def get_exit_code(run_summaries):
+    if any(run_summary['error'] is not None or run_summary['failed_reports'] or run_summary['aborted'] for run_summary in run_summaries):
+        return exit_code_failed
+    if any(run_summary['all_files_skipped'] for run_summary in run_summaries):
+        return exit_code_all_skipped
+    if any(run_summary['issues'] for run_summary in run_summaries):
+        return exit_code_issues
+    return exit_code_no_issues
+
+
+# Function to write the JSON summary of a run to stdout (and to the --summary file)
+def write_cli_summary(run_summary, summary_file_path):
+    summary_json = json.dumps(run_summary, indent=2)
+    print(summary_json)
+    if summary_file_path:
+        with open(summary_file_path, 'w', encoding='utf-8') as summary_file:
+            summary_file.write(summary_json + '\n')
+
+
+# Function to read the validation settings of the command line config file, returns None if the config file cannot be read
+def read_cli_settings(config_file_path):
+    try:
+        return load_settings(config_file_path)
+    except (KeyError, ValueError, TypeError, configparser.Error) as e:
+        print(f'Invalid config file: {config_file_path} [Error: {str(e)}]', file=sys.stderr)
+        return None
 
 
 def main():
-    app = QApplication(sys.argv)
-    win = Window()
-    win.show()
-    sys.exit(app.exec_())
+    arguments = parse_arguments(sys.argv[1:])
+    if arguments.config:
+        if not os.path.isfile(arguments.config):
+            print(f'Config file not found: {arguments.config}', file=sys.stderr)
+            sys.exit(exit_code_usage)
+
+    # Setup command of the NLTK words corpus (validation runs do not download it)
+    if arguments.download_nltk_words:
+        if not download_nltk_words():
+            print('The NLTK words corpus could not be downloaded', file=sys.stderr)
+            sys.exit(exit_code_failed)
+        print('NLTK words corpus installed')
+        return
+
+    # Invalidation command of the known-good store (persons, entities and accounts are validated in full again)
+    if arguments.clear_known_good_store:
+        settings = read_cli_settings(arguments.config or config_file)
+        if settings is None:
+            sys.exit(exit_code_usage)
+        # Without a store in the config file there are no store files to clear
+        if not settings.known_good_store_file:
+            print('No known-good store to clear (KnownGoodStore is empty in the config file)')
+            return
+        ValidationSession(settings).known_good_store.clear()
+        print(f'Known-good store cleared: {settings.known_good_store_file}')
+        # The stores of the reporting entities of batch runs (the store file name with the RE ID added)
+        store_file_name, store_file_extension = os.path.splitext(settings.known_good_store_file)
+        for store_file in sorted(glob.glob(f'{glob.escape(store_file_name)}_*{glob.escape(store_file_extension)}')):
+            if store_file[len(store_file_name) + 1:len(store_file) - len(store_file_extension)].isdecimal() and os.path.isfile(store_file):
+                KnownGoodStore(store_file, settings.known_good_store_size, settings).clear()
+                print(f'Known-good store cleared: {store_file}')
+        return
+
+    if arguments.input is not None or arguments.entities is not None:
+        sys.exit(run_cli(arguments))
+
+    # The config file of the GUI is checked first, so that an invalid config file is reported as in the command line mode
+    settings = read_cli_settings(arguments.config or config_file)
+    if settings is None:
+        sys.exit(exit_code_usage)
+    # The GUI is in its own module, so that PyQt5 is only imported when the GUI is started. It imports this module as
+    # main, which is __main__ when main.py is run as a script: it is given this module, not a second copy of main.py
+    sys.modules.setdefault('main', sys.modules[__name__])
+    import goaml_gui
+    goaml_gui.main(ValidationSession(settings))
 
 if __name__ == "__main__":
+    # Required for the worker processes of parallel validation when the tool is packaged as an executable
+    freeze_support()
     main()
\ No newline at end of file